@@ -0,0 +1,142 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Replays the dashboard's recommendation thresholds and the holdings sell rule
+# over historical closes. Time is walked once; every step is a NumPy operation
+# across all symbols. Each day the trailing `lookback`-day change is labelled
+# like the performance table, and the label moves the symbol's exposure:
+#   Strong Buy -> 1.0, Buy -> at least 0.5, Hold -> unchanged,
+#   Sell -> at most 0.5, Strong Sell -> 0.
+# A position is also closed once the close is sell_rule_pct% above its cost
+# basis. Every symbol gets an equal slice of capital.
+
+def backtest(close, lookback=20, strong_buy=7.0, buy=3.0, sell=5.0, strong_sell=10.0,
+             sell_rule_pct=5.0, trading_days=252, return_equity=False):
+    """Backtest one threshold set on a (days x symbols) close array; returns a metrics dict."""
+    close = np.asarray(close, dtype=float)
+    n_days, n_symbols = close.shape
+    exposure = np.zeros(n_symbols)
+    basis = np.full(n_symbols, np.nan)
+    equity = np.ones(n_days)
+    wins = trades = 0
+    exposure_days = 0.0
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        daily_return = np.nan_to_num(close[1:] / close[:-1] - 1)
+        change = np.full_like(close, np.nan)
+        change[lookback:] = (close[lookback:] / close[:-lookback] - 1) * 100
+
+    for t in range(1, n_days):
+        # Yesterday's exposure earns today's return
+        equity[t] = equity[t - 1] * (1 + (exposure * daily_return[t - 1]).sum() / n_symbols)
+        exposure_days += exposure.mean()
+
+        price, chg = close[t], change[t]
+        valid = ~np.isnan(price) & ~np.isnan(chg)
+        target = exposure.copy()
+        target = np.where(valid & (chg <= -buy), np.maximum(target, 0.5), target)
+        target = np.where(valid & (chg <= -strong_buy), 1.0, target)
+        target = np.where(valid & (chg >= sell), np.minimum(target, 0.5), target)
+        target = np.where(valid & (chg >= strong_sell), 0.0, target)
+        with np.errstate(invalid="ignore"):
+            target = np.where((exposure > 0) & (price >= basis * (1 + sell_rule_pct / 100)), 0.0, target)
+
+        adding = target > exposure
+        with np.errstate(invalid="ignore", divide="ignore"):
+            basis = np.where(adding,
+                             np.where(exposure > 0, (basis * exposure + price * (target - exposure)) / target, price),
+                             basis)
+        closing = (exposure > 0) & (target == 0)
+        if closing.any():
+            trades += int(closing.sum())
+            wins += int((price[closing] > basis[closing]).sum())
+            basis = np.where(closing, np.nan, basis)
+        exposure = target
+
+    years = max(n_days - 1, 1) / trading_days
+    peak = np.maximum.accumulate(equity)
+    metrics = {
+        "Total Return (%)": round(float(equity[-1] - 1) * 100, 2),
+        "CAGR (%)": round(float(equity[-1] ** (1 / years) - 1) * 100, 2) if equity[-1] > 0 else -100.0,
+        "Max Drawdown (%)": round(float(((equity - peak) / peak).min()) * 100, 2),
+        "Hit Rate (%)": round(wins / trades * 100, 2) if trades else np.nan,
+        "Trades": trades,
+        "Exposure (%)": round(float(exposure_days) / max(n_days - 1, 1) * 100, 2),
+    }
+    if return_equity:
+        return metrics, equity
+    return metrics
+
+
+def param_grid(**axes):
+    """Every combination of the given parameter values, as a list of kwargs dicts."""
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+# The close array is sent to each worker once, not once per parameter set
+_worker_close = None
+
+
+def _init_worker(close):
+    global _worker_close
+    _worker_close = close
+
+
+def _run_chunk(params_chunk):
+    return [{**params, **backtest(_worker_close, **params)} for params in params_chunk]
+
+
+def sweep(close, grid, max_workers=None, chunk_size=8, on_progress=None):
+    """Backtest every parameter set in `grid` on a process pool; returns a frame sorted by total return."""
+    close = np.asarray(close, dtype=float)
+    chunks = [grid[i:i + chunk_size] for i in range(0, len(grid), chunk_size)]
+    rows = []
+    pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(close,))
+    try:
+        for chunk_rows in pool.map(_run_chunk, chunks):
+            rows.extend(chunk_rows)
+            if on_progress:
+                on_progress(len(rows), len(grid))
+    finally:
+        # on_progress may raise to stop the sweep (a Streamlit rerun); drop the queued chunks instead of waiting
+        pool.shutdown(wait=False, cancel_futures=True)
+    return pd.DataFrame(rows).sort_values("Total Return (%)", ascending=False).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    # python backtest.py --symbols-file universe.txt --years 10 --workers 8
+    import argparse
+    import datetime
+
+    from performance import wide_field
+    from price_store import PriceStore
+
+    parser = argparse.ArgumentParser(description="Sweep recommendation thresholds over cached history")
+    parser.add_argument("symbols", nargs="*")
+    parser.add_argument("--symbols-file")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default="backtest_sweep.csv")
+    args = parser.parse_args()
+
+    symbols = list(args.symbols)
+    if args.symbols_file:
+        with open(args.symbols_file) as f:
+            symbols += [line.strip() for line in f if line.strip()]
+    if not symbols:
+        parser.error("no symbols given")
+
+    end = datetime.date.today() + datetime.timedelta(days=1)
+    data = PriceStore().get(symbols, end - datetime.timedelta(days=365 * args.years), end)
+    close = wide_field(data, "Close").to_numpy(dtype=float)
+    grid = param_grid(lookback=[10, 20, 60, 120], strong_buy=[5.0, 7.0, 10.0, 15.0], buy=[2.0, 3.0, 5.0],
+                      sell=[3.0, 5.0, 8.0], strong_sell=[10.0, 15.0, 20.0], sell_rule_pct=[3.0, 5.0, 10.0])
+    results = sweep(close, grid, max_workers=args.workers,
+                    on_progress=lambda done, total: print(f"\r{done}/{total}", end="", flush=True))
+    print()
+    results.to_csv(args.output, index=False)
+    print(results.head(10).to_string(index=False))
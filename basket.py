@@ -0,0 +1,120 @@
+import asyncio
+
+# Basket order execution: validate a list of orders up front, place them
+# concurrently (the rate-limited client keeps us inside the broker's order
+# limits), then follow each order to a terminal state on one asyncio loop and
+# report every status change so the UI can show a live fill table.
+
+TERMINAL_STATUSES = {"COMPLETE", "CANCELLED", "REJECTED"}
+
+
+def validate_basket(orders, instrument_index, portfolio=None):
+    """Return a list of error strings, one per order (None when the order is fine)."""
+    errors = []
+    sell_totals = {}
+    for order in orders:
+        key = (order["exchange"], order["tradingsymbol"])
+        instrument = instrument_index.get(*key)
+        quantity = order.get("quantity") or 0
+        if instrument is None:
+            errors.append(f"Unknown instrument {key[1]} on {key[0]}")
+        elif quantity <= 0:
+            errors.append("Quantity must be positive")
+        elif quantity % (instrument.get("lot_size") or 1):
+            errors.append(f"Quantity must be a multiple of lot size {instrument['lot_size']}")
+        elif order["transaction_type"] == "SELL" and portfolio is not None:
+            # Several SELL legs for one instrument share the same holding
+            sell_totals[key] = sell_totals.get(key, 0) + quantity
+            held = (portfolio.holding(*key) or {}).get("quantity", 0)
+            errors.append(None if sell_totals[key] <= held else f"Selling {sell_totals[key]} but only {held} held")
+        else:
+            errors.append(None)
+    return errors
+
+
+class BasketExecutor:
+    def __init__(self, kite, portfolio=None, max_concurrency=10, poll_interval_seconds=1.0, timeout_seconds=120):
+        self.kite = kite
+        self.portfolio = portfolio
+        self.max_concurrency = max_concurrency
+        self.poll_interval_seconds = poll_interval_seconds
+        self.timeout_seconds = timeout_seconds
+        self.status = []
+        self._loop = None
+        self._changed = None
+
+    def _update(self, row, **fields):
+        row.update(fields)
+        self._changed.set()
+
+    async def _place(self, row, order, semaphore):
+        async with semaphore:
+            try:
+                params = {k: v for k, v in order.items() if v is not None}
+                params.setdefault("variety", self.kite.VARIETY_REGULAR)
+                params.setdefault("order_type", self.kite.ORDER_TYPE_MARKET)
+                params.setdefault("product", self.kite.PRODUCT_CNC)
+                # The client is blocking; run it off the loop so orders go out in parallel
+                order_id = await asyncio.to_thread(self.kite.place_order, **params)
+                self._update(row, order_id=order_id, status="PLACED")
+            except Exception as e:
+                self._update(row, status="FAILED", message=str(e))
+                return
+        await self._track(row)
+
+    async def _track(self, row):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout_seconds
+        while row["status"] not in TERMINAL_STATUSES:
+            if loop.time() > deadline:
+                self._update(row, message="Timed out waiting for a final status")
+                return
+            try:
+                history = await asyncio.to_thread(self.kite.order_history, row["order_id"])
+            except Exception as e:
+                self._update(row, message=str(e))
+                await asyncio.sleep(self.poll_interval_seconds)
+                continue
+            latest = history[-1]
+            if latest["status"] != row["status"] or latest.get("filled_quantity") != row["filled_quantity"]:
+                self._update(row, status=latest["status"], filled_quantity=latest.get("filled_quantity", 0),
+                             average_price=latest.get("average_price"), message=latest.get("status_message"))
+            if row["status"] not in TERMINAL_STATUSES:
+                await asyncio.sleep(self.poll_interval_seconds)
+
+    def _apply_postback(self, payload):
+        for row in self.status:
+            if row.get("order_id") == payload.get("order_id"):
+                self._update(row, status=payload["status"], filled_quantity=payload.get("filled_quantity", 0),
+                             average_price=payload.get("average_price"), message=payload.get("status_message"))
+
+    def handle_postback(self, payload):
+        """Apply a Kite order postback (same fields as order_history entries) from any thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._apply_postback, payload)
+
+    async def _run(self, orders, on_update):
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.status = [{"tradingsymbol": o["tradingsymbol"], "transaction_type": o["transaction_type"],
+                        "quantity": o["quantity"], "order_id": None, "status": "PENDING",
+                        "filled_quantity": 0, "average_price": None, "message": None} for o in orders]
+        tasks = [asyncio.create_task(self._place(row, order, semaphore)) for row, order in zip(self.status, orders)]
+        pending = set(tasks)
+        while pending:
+            waiter = asyncio.create_task(self._changed.wait())
+            done, _ = await asyncio.wait(pending | {waiter}, return_when=asyncio.FIRST_COMPLETED)
+            pending -= done
+            waiter.cancel()
+            self._changed.clear()
+            if on_update:
+                on_update([dict(row) for row in self.status])
+        self._loop = None
+        if self.portfolio is not None:
+            self.portfolio.invalidate()
+        return self.status
+
+    def run(self, orders, on_update=None):
+        """Place and track a basket; blocks until every order is final. Returns the status rows."""
+        return asyncio.run(self._run(orders, on_update))
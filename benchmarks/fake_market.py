@@ -0,0 +1,130 @@
+import contextlib
+import functools
+import sys
+import time
+import types
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# Deterministic market data for benchmarks and offline runs. Every symbol gets
+# its own seeded random walk starting from a fixed epoch, so a symbol's bars do
+# not depend on which other symbols or which window were requested.
+# FakeYFinance answers download() and Ticker().info in yfinance's layouts.
+
+EPOCH = pd.Timestamp("2000-01-03")
+_FIELDS = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+
+def _seed(symbol):
+    return zlib.crc32(symbol.encode())
+
+
+@functools.lru_cache(maxsize=8)
+def _calendar(end):
+    # bdate_range is slow enough to dominate a 500-symbol download; build it once per end date
+    return pd.bdate_range(EPOCH, end - pd.Timedelta(days=1))
+
+
+def synthetic_bars(symbol, start, end):
+    """Business-day OHLCV for one symbol over [start, end)."""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    days = _calendar(end)
+    rng = np.random.default_rng(_seed(symbol))
+    n = len(days)
+    base = 50 + (_seed(symbol) % 2000)
+    close = base * np.exp(np.cumsum(rng.normal(0.0003, 0.015, n)))
+    open_ = close * (1 + rng.normal(0, 0.004, n))
+    spread = np.abs(rng.normal(0, 0.008, n))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    volume = rng.integers(100_000, 5_000_000, n).astype(float)
+    bars = pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close,
+                         "Adj Close": close, "Volume": volume}, index=days)
+    bars.index.name = "Date"
+    return bars[bars.index >= start]
+
+
+def synthetic_panel(symbols, start, end):
+    """(symbol, field) MultiIndex frame, the shape PriceStore.get returns."""
+    frames = {symbol: synthetic_bars(symbol, start, end)[["Open", "High", "Low", "Close", "Volume"]]
+              for symbol in symbols}
+    return pd.concat(frames, axis=1)
+
+
+def synthetic_symbols(n):
+    return [f"SYN{i:04d}.NS" for i in range(n)]
+
+
+def synthetic_info(symbol):
+    rng = np.random.default_rng(_seed(symbol))
+    last = synthetic_bars(symbol, EPOCH, pd.Timestamp.today().normalize() + pd.Timedelta(days=1))["Close"]
+    return {
+        "longName": f"{symbol.split('.')[0]} Synthetic Ltd",
+        "shortName": symbol.split(".")[0],
+        "marketCap": int(rng.integers(10**9, 10**13)),
+        "trailingPE": float(rng.uniform(5, 80)),
+        "beta": float(rng.uniform(0.3, 1.8)),
+        "fiftyTwoWeekHigh": float(last.tail(252).max()),
+        "fiftyTwoWeekLow": float(last.tail(252).min()),
+        "forwardDividendRate": float(round(rng.uniform(0, 20), 2)),
+        "dividendYield": float(rng.uniform(0, 0.04)),
+    }
+
+
+class FakeTicker:
+    def __init__(self, symbol, latency_seconds=0.0):
+        self.ticker = symbol
+        self._latency_seconds = latency_seconds
+
+    @property
+    def info(self):
+        time.sleep(self._latency_seconds)
+        return synthetic_info(self.ticker)
+
+
+class FakeYFinance:
+    """Stand-in for the yfinance module: download() and Ticker() with optional latency."""
+
+    def __init__(self, latency_seconds=0.0, info_latency_seconds=0.0):
+        self.latency_seconds = latency_seconds
+        self.info_latency_seconds = info_latency_seconds
+        self.download_calls = 0
+
+    def download(self, tickers, start=None, end=None, group_by="column", progress=True,
+                 multi_level_index=True, **kwargs):
+        self.download_calls += 1
+        time.sleep(self.latency_seconds)
+        symbols = tickers.split() if isinstance(tickers, str) else list(tickers)
+        end = pd.Timestamp(end) if end is not None else pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+        start = pd.Timestamp(start) if start is not None else end - pd.Timedelta(days=365)
+        frames = {symbol: synthetic_bars(symbol, start, end)[_FIELDS] for symbol in symbols}
+        if len(symbols) == 1 and not multi_level_index:
+            return frames[symbols[0]]
+        raw = pd.concat(frames, axis=1, names=["Ticker", "Price"])
+        if group_by != "ticker":
+            # yfinance's default layout is (field, symbol)
+            raw = raw.swaplevel(0, 1, axis=1).sort_index(axis=1, level=0, sort_remaining=False)
+        return raw
+
+    def Ticker(self, symbol):
+        return FakeTicker(symbol, self.info_latency_seconds)
+
+
+@contextlib.contextmanager
+def patched_yfinance(fake=None):
+    """Make `import yfinance` return the fake for the duration of the block."""
+    fake = fake or FakeYFinance()
+    module = types.ModuleType("yfinance")
+    module.download = fake.download
+    module.Ticker = fake.Ticker
+    previous = sys.modules.get("yfinance")
+    sys.modules["yfinance"] = module
+    try:
+        yield fake
+    finally:
+        if previous is None:
+            sys.modules.pop("yfinance", None)
+        else:
+            sys.modules["yfinance"] = previous
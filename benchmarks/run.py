@@ -0,0 +1,204 @@
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fake_market import FakeYFinance, patched_yfinance, synthetic_panel, synthetic_symbols
+from indicators import IndicatorEngine
+from performance import normalize_to_start, performance_summary, wide_field
+from price_store import PriceStore, normalize_download
+from ticker_info import TickerInfoCache
+
+# Times the dashboard's data pipeline on synthetic data at several universe
+# sizes and writes the results as JSON, so a change in cost shows up as a diff
+# in review. Nothing here touches the network: `yfinance` is swapped for the
+# fake market, so the store and ticker-info benchmarks go through the same
+# download and Ticker.info entry points the dashboard uses.
+#
+#   python -m benchmarks.run --sizes 10 100 500 --output benchmarks/results.json
+#   python -m benchmarks.run --baseline benchmarks/results.json
+
+DEFAULT_SIZES = (10, 100, 500)
+THRESHOLDS = (7.0, 3.0, 5.0, 10.0)
+
+
+def timed(func, repeats):
+    """min/median wall time in ms over `repeats` calls; returns (stats, last result)."""
+    samples = []
+    result = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"min_ms": round(min(samples), 3), "median_ms": round(statistics.median(samples), 3),
+            "repeats": repeats}, result
+
+
+def bench_normalization(symbols, start, end, repeats):
+    fake = FakeYFinance()
+    by_ticker = fake.download(symbols, start=start, end=end, group_by="ticker")
+    by_field = fake.download(symbols, start=start, end=end)
+    singles = {s: fake.download(s, start=start, end=end, multi_level_index=False) for s in symbols}
+    return {
+        "normalize_download (symbol, field)": timed(lambda: normalize_download(by_ticker, symbols), repeats)[0],
+        "normalize_download (field, symbol)": timed(lambda: normalize_download(by_field, symbols), repeats)[0],
+        "normalize_download (single symbol, per symbol)": timed(
+            lambda: [normalize_download(raw, [s]) for s, raw in singles.items()], repeats)[0],
+    }
+
+
+def bench_store(symbols, start, end, repeats):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cold = []
+        for i in range(repeats):
+            store = PriceStore(os.path.join(tmp, f"cold{i}.db"))
+            cold.append(timed(lambda: store.get(symbols, start, end), 1)[0]["min_ms"])
+        results["PriceStore.get (cold: fetch + write + read)"] = {
+            "min_ms": min(cold), "median_ms": round(statistics.median(cold), 3), "repeats": repeats}
+        results["PriceStore.get (warm: read only)"] = timed(lambda: store.get(symbols, start, end), repeats)[0]
+    return results
+
+
+def bench_ticker_info(symbols, repeats):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TickerInfoCache(os.path.join(tmp, "info.json"))
+        stats, _ = timed(lambda: [cache.get(s) for s in symbols], 1)
+        results["TickerInfoCache.get (cold)"] = stats
+        results["TickerInfoCache.get (warm)"] = timed(lambda: [cache.get(s) for s in symbols], repeats)[0]
+    return results
+
+
+def bench_analysis(frame, symbols, repeats):
+    panel = frame[[s for s in frame.columns.get_level_values(0).unique() if s != "^NSEI"]]
+    results = {"performance_summary": timed(lambda: performance_summary(panel, symbols, *THRESHOLDS), repeats)[0]}
+
+    def nifty_normalization():
+        normalized = normalize_to_start(wide_field(frame, "Close", ["^NSEI"] + symbols))
+        return normalized.loc[frame[("^NSEI", "Close")].dropna().index]
+    results["NIFTY normalization"] = timed(nifty_normalization, repeats)[0]
+
+    results["IndicatorEngine.sync (full)"] = timed(lambda: IndicatorEngine().sync(panel), repeats)[0]
+    engine = IndicatorEngine()
+
+    def incremental():
+        engine.sync(panel.iloc[:-1])
+        started = time.perf_counter()
+        engine.sync(panel)
+        return (time.perf_counter() - started) * 1000
+    samples = [incremental() for _ in range(repeats)]
+    results["IndicatorEngine.sync (one new bar)"] = {
+        "min_ms": round(min(samples), 3), "median_ms": round(statistics.median(samples), 3), "repeats": repeats}
+    return results
+
+
+def bench_prophet(frame, symbols, limit):
+    if importlib.util.find_spec("prophet") is None:
+        return {"Prophet fit/predict": {"skipped": "prophet is not installed"}}
+    from forecasting import forecast_horizons, prophet_history
+
+    fitted = symbols[:limit] if limit else symbols
+    samples = []
+    for symbol in fitted:
+        history = prophet_history(frame[symbol])
+        started = time.perf_counter()
+        forecast_horizons(symbol, history)
+        samples.append((time.perf_counter() - started) * 1000)
+    per_symbol = statistics.median(samples)
+    return {"Prophet fit/predict": {
+        "min_ms": round(min(samples), 3), "median_ms": round(per_symbol, 3), "repeats": len(samples),
+        # Sequential estimate for the whole universe when only a sample was fitted
+        "estimated_total_ms": round(per_symbol * len(symbols), 1),
+    }}
+
+
+def run(sizes=DEFAULT_SIZES, years=5, repeats=5, prophet_limit=10, skip=()):
+    end = pd.Timestamp(datetime.date.today()) + pd.Timedelta(days=1)
+    start = end - pd.DateOffset(years=years)
+    results = []
+    for n in sizes:
+        symbols = synthetic_symbols(n)
+        frame = synthetic_panel(symbols + ["^NSEI"], start, end)
+        groups = {
+            "normalization": lambda: bench_normalization(symbols, start, end, repeats),
+            "store": lambda: bench_store(symbols, start, end, repeats),
+            "ticker_info": lambda: bench_ticker_info(symbols, repeats),
+            "analysis": lambda: bench_analysis(frame, symbols, repeats),
+            "prophet": lambda: bench_prophet(frame, symbols, prophet_limit),
+        }
+        for group, bench in groups.items():
+            if group in skip:
+                continue
+            with patched_yfinance():
+                stats_by_name = bench()
+            for name, stats in stats_by_name.items():
+                results.append({"benchmark": name, "group": group, "symbols": n, "rows": len(frame), **stats})
+                print(f"{n:5d} symbols  {name:50s} {stats.get('median_ms', stats.get('skipped'))}", flush=True)
+    return {
+        "meta": {
+            "measured_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "years": years,
+            "repeats": repeats,
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold_pct):
+    """Benchmarks whose median got slower than the baseline by more than threshold_pct."""
+    before = {(r["benchmark"], r["symbols"]): r for r in baseline["results"] if "median_ms" in r}
+    regressions = []
+    for row in report["results"]:
+        old = before.get((row["benchmark"], row["symbols"]))
+        if old and "median_ms" in row and old["median_ms"]:
+            change = (row["median_ms"] / old["median_ms"] - 1) * 100
+            if change > threshold_pct:
+                regressions.append((row["benchmark"], row["symbols"], old["median_ms"], row["median_ms"], change))
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the data pipeline on synthetic OHLCV")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--prophet-limit", type=int, default=10,
+                        help="fit at most this many symbols per size and extrapolate (0 = all)")
+    parser.add_argument("--skip", nargs="*", default=[],
+                        choices=["normalization", "store", "ticker_info", "analysis", "prophet"])
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(__file__), "results.json"))
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=25.0, help="percent slowdown reported as a regression")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        # Read first: the baseline is usually the file about to be overwritten
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    report = run(args.sizes, args.years, args.repeats, args.prophet_limit, set(args.skip))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if baseline:
+        regressions = compare(report, baseline, args.threshold)
+        for name, n, old_ms, new_ms, change in regressions:
+            print(f"REGRESSION {name} @ {n} symbols: {old_ms:.1f} -> {new_ms:.1f} ms ({change:+.0f}%)")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,221 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
+
+import tracing
+
+# Broker access for the Streamlit sessions in the process. Each browser
+# session logs in with its own KiteConnect client and access token; what is
+# shared per API key is only the ApiThrottle: a token bucket per endpoint
+# group sized to Kite Connect's published limits, and coalescing of identical
+# in-flight reads made with the same access token. A short-TTL
+# holdings/positions cache sits on top.
+
+# Requests per second allowed by Kite Connect for each endpoint group
+ENDPOINT_RATE_LIMITS = {"quote": 1, "historical": 3, "order": 10, "default": 10}
+ENDPOINT_GROUPS = {
+    "quote": "quote", "ltp": "quote", "ohlc": "quote",
+    "historical_data": "historical",
+    "place_order": "order", "modify_order": "order", "cancel_order": "order",
+}
+# Idempotent calls that several sessions may safely share one response for
+COALESCED_METHODS = {
+    "profile", "margins", "holdings", "positions", "orders", "trades", "order_history",
+    "quote", "ltp", "ohlc", "instruments", "historical_data",
+}
+
+# Client-side helpers that never reach the API
+LOCAL_METHODS = {"login_url", "set_access_token", "set_session_expiry_hook"}
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second, capacity=None):
+        self.rate = rate_per_second
+        self.capacity = capacity or rate_per_second
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class ApiThrottle:
+    """Rate limits and in-flight reads for one API key, shared by every client using it."""
+
+    def __init__(self, rate_limits=ENDPOINT_RATE_LIMITS):
+        self.buckets = {group: TokenBucket(rate) for group, rate in rate_limits.items()}
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+
+class RateLimitedKite:
+    """Proxy for a KiteConnect client that rate-limits and coalesces API calls.
+
+    Clients built with the same `throttle` share its limits; a read is only
+    coalesced with one made under the same access token, so one account's
+    response is never handed to another. Non-callable attributes (constants
+    such as TRANSACTION_TYPE_BUY) pass through.
+    """
+
+    def __init__(self, kite, throttle=None, rate_limits=ENDPOINT_RATE_LIMITS):
+        self._kite = kite
+        self._throttle = throttle or ApiThrottle(rate_limits)
+
+    def _call(self, name, method, args, kwargs):
+        with tracing.span(f"kite.{name}"):
+            self._throttle.buckets[ENDPOINT_GROUPS.get(name, "default")].acquire()
+            return method(*args, **kwargs)
+
+    def _coalesced(self, name, method, args, kwargs):
+        throttle = self._throttle
+        key = (getattr(self._kite, "access_token", None), name, repr(args), repr(sorted(kwargs.items())))
+        with throttle.lock:
+            future = throttle.in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = throttle.in_flight[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            future.set_result(self._call(name, method, args, kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with throttle.lock:
+                throttle.in_flight.pop(key, None)
+        return future.result()
+
+    def __getattr__(self, name):
+        attr = getattr(self._kite, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        if name in LOCAL_METHODS:
+            return attr
+        if name in COALESCED_METHODS:
+            return lambda *args, **kwargs: self._coalesced(name, attr, args, kwargs)
+        return lambda *args, **kwargs: self._call(name, attr, args, kwargs)
+
+
+def _digest(secret):
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+
+class BrokerSession:
+    """One browser session's Kite login. Keep it in st.session_state, never in a process-wide cache."""
+
+    def __init__(self, api_key, kite_factory=None, throttle=None):
+        if kite_factory is None:
+            from kiteconnect import KiteConnect
+            kite_factory = KiteConnect
+        self.api_key = api_key
+        self.raw = kite_factory(api_key=api_key)
+        self.client = RateLimitedKite(self.raw, throttle)
+        self.user_name = None
+        self._secret_digest = None
+
+    @property
+    def access_token(self):
+        return getattr(self.raw, "access_token", None)
+
+    @property
+    def is_authenticated(self):
+        return bool(self.access_token)
+
+    def login_url(self):
+        return self.raw.login_url()
+
+    def generate_session(self, request_token, api_secret):
+        data = self.client.generate_session(request_token, api_secret=api_secret)
+        self.raw.set_access_token(data["access_token"])
+        try:
+            self.user_name = self.client.profile()["user_name"]
+        except Exception:
+            # Token is useless if the profile call fails; drop it
+            self.raw.set_access_token(None)
+            raise
+        self._secret_digest = _digest(api_secret)
+        return data
+
+    def matches(self, api_key, api_secret):
+        """Whether this login was made with these credentials (the secret is compared by digest)."""
+        return api_key == self.api_key and (self._secret_digest is None or self._secret_digest == _digest(api_secret))
+
+    def logout(self):
+        self.raw.set_access_token(None)
+        self.user_name = None
+        self._secret_digest = None
+
+
+def batch_ltp(kite, keys, batch_size=1000):
+    """LTP for many "EXCHANGE:SYMBOL" keys in as few calls as Kite allows (1000 per call)."""
+    prices = {}
+    keys = list(dict.fromkeys(keys))
+    for i in range(0, len(keys), batch_size):
+        for key, quote in kite.ltp(keys[i:i + batch_size]).items():
+            prices[key] = quote["last_price"]
+    return prices
+
+
+class PortfolioCache:
+    def __init__(self, kite, ttl_seconds=30):
+        self.kite = kite
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._holdings = None
+        self._positions = None
+
+    def _fresh(self, entry):
+        return entry is not None and time.time() - entry[0] < self.ttl_seconds
+
+    def _load_holdings(self):
+        with self._lock:
+            tracing.annotate(cache="hit" if self._fresh(self._holdings) else "miss")
+            if not self._fresh(self._holdings):
+                rows = self.kite.holdings()
+                index = {(row["exchange"], row["tradingsymbol"]): row for row in rows}
+                self._holdings = (time.time(), rows, index)
+            return self._holdings
+
+    def _load_positions(self):
+        with self._lock:
+            tracing.annotate(cache="hit" if self._fresh(self._positions) else "miss")
+            if not self._fresh(self._positions):
+                positions = self.kite.positions()
+                index = {(row["exchange"], row["tradingsymbol"]): row for row in positions.get("net", [])}
+                self._positions = (time.time(), positions, index)
+            return self._positions
+
+    def holdings(self):
+        return self._load_holdings()[1]
+
+    def holding(self, exchange, tradingsymbol):
+        return self._load_holdings()[2].get((exchange, tradingsymbol))
+
+    def positions(self):
+        return self._load_positions()[1]
+
+    def position(self, exchange, tradingsymbol):
+        """Net position for the instrument, if any."""
+        return self._load_positions()[2].get((exchange, tradingsymbol))
+
+    def invalidate(self):
+        with self._lock:
+            self._holdings = None
+            self._positions = None
+
+    def place_order(self, **order):
+        order_id = self.kite.place_order(**order)
+        self.invalidate()
+        return order_id
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+# Server-side point reduction for Plotly/Streamlit charts. Candles are merged
+# into coarser bars (open of the first, max high, min low, close of the last,
+# summed volume) and line series use Largest-Triangle-Three-Buckets, so the
+# shape of the series survives while the payload stays bounded.
+
+DEFAULT_MAX_POINTS = 1500
+
+
+def max_points_for_width(width_px, points_per_px=1.0, floor=200):
+    """Roughly one point per horizontal pixel is all a chart can show."""
+    return max(floor, int(width_px * points_per_px))
+
+
+def downsample_ohlcv(bars, max_points=DEFAULT_MAX_POINTS):
+    """Merge consecutive OHLCV rows into at most `max_points` candles."""
+    if len(bars) <= max_points:
+        return bars
+    bucket = np.arange(len(bars)) * max_points // len(bars)
+    grouped = bars.groupby(bucket)
+    merged = pd.DataFrame({
+        "Open": grouped["Open"].first(),
+        "High": grouped["High"].max(),
+        "Low": grouped["Low"].min(),
+        "Close": grouped["Close"].last(),
+        "Volume": grouped["Volume"].sum(),
+    })
+    # Each candle is stamped with the date it opens on
+    merged.index = bars.index[np.searchsorted(bucket, merged.index)]
+    for col in bars.columns.difference(merged.columns):
+        # Overlays such as moving averages keep the value at the end of the bucket
+        merged[col] = grouped[col].last().to_numpy()
+    return merged[list(bars.columns)]
+
+
+def lttb_indices(x, y, max_points):
+    """Row positions kept by Largest-Triangle-Three-Buckets for one series."""
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+    keep = np.empty(max_points, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    a = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean() if next_end > end else x[-1]
+        avg_y = y[end:next_end].mean() if next_end > end else y[-1]
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def downsample_lines(frame, max_points=DEFAULT_MAX_POINTS):
+    """LTTB-reduce every column of a date-indexed frame to at most `max_points` rows.
+
+    Rows chosen for any column are kept for all, so the columns stay aligned
+    for st.line_chart / st.area_chart.
+    """
+    if len(frame) <= max_points:
+        return frame
+    x = frame.index.asi8.astype(float) if isinstance(frame.index, pd.DatetimeIndex) else np.arange(len(frame), dtype=float)
+    per_column = max(3, max_points // max(1, frame.shape[1]))
+    keep = set()
+    for col in frame.columns:
+        values = frame[col].to_numpy(dtype=float)
+        valid = np.flatnonzero(~np.isnan(values))
+        if len(valid):
+            keep.update(valid[lttb_indices(x[valid], values[valid], per_column)].tolist())
+    return frame.iloc[sorted(keep)]
+
+
+def window(frame, start=None, end=None):
+    """Rows between two dates (inclusive) for zoomed-in, full-resolution views."""
+    if start is not None:
+        frame = frame[frame.index >= pd.Timestamp(start)]
+    if end is not None:
+        frame = frame[frame.index <= pd.Timestamp(end)]
+    return frame
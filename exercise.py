@@ -1,55 +1,82 @@
 # app.py
+import io
 import streamlit as st
 import pandas as pd
-import sqlite3
 from datetime import datetime, date
 import matplotlib.pyplot as plt
+from workout_store import COLUMNS, DB_PATH, WorkoutStore
 
 # ---------- DB helpers ----------
-DB_PATH = "progress.db"
-
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""CREATE TABLE IF NOT EXISTS workouts (
-                   id INTEGER PRIMARY KEY AUTOINCREMENT,
-                   entry_date TEXT,
-                   workout_type TEXT,
-                   exercise TEXT,
-                   sets INTEGER,
-                   reps INTEGER,
-                   assistance_level TEXT,
-                   dead_hang_seconds REAL,
-                   negative_seconds REAL,
-                   notes TEXT
-                 )""")
-    conn.commit()
-    conn.close()
+@st.cache_resource  # one connection per server process, shared by every session
+def get_store(db_path=DB_PATH):
+    return WorkoutStore(db_path)
 
 def insert_row(row):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""INSERT INTO workouts (entry_date, workout_type, exercise, sets, reps,
-                 assistance_level, dead_hang_seconds, negative_seconds, notes)
-                 VALUES (?,?,?,?,?,?,?,?,?)""",
-              (row['entry_date'], row['workout_type'], row['exercise'], row['sets'],
-               row['reps'], row['assistance_level'], row['dead_hang_seconds'],
-               row['negative_seconds'], row['notes']))
-    conn.commit()
-    conn.close()
+    get_store().insert(row)
+
+def insert_rows(rows):
+    return get_store().insert_many(rows)
 
 def read_data():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM workouts ORDER BY entry_date", conn, parse_dates=['entry_date'])
-    conn.close()
-    return df
+    return get_store().read()
+
+def daily_progress(metric, exercise_like=()):
+    return get_store().daily_progress(metric, exercise_like)
+
+# ---------- Charts ----------
+# chart -> (metric, exercise LIKE patterns, title, y label)
+CHARTS = {
+    "dead_hang": ("dead_hang_seconds", (), "Max dead hang (seconds) over time", "Seconds"),
+    "negative": ("negative_seconds", (), "Max negative descent (seconds) over time", "Seconds"),
+    # assisted reps (exercise contains "Assisted", "Pull" or "Chin")
+    "assisted_reps": ("reps", ("%Assisted%", "%Pull%", "%Chin%"), "Max assisted reps over time", "Reps"),
+}
+
+# Both caches are keyed by (chart, data version), so a rerun with unchanged
+# data re-sends the stored result instead of querying or drawing again;
+# max_entries makes them LRUs that old versions age out of.
+@st.cache_data(max_entries=32, show_spinner=False)
+def chart_data(chart, version):
+    metric, exercise_like, _, _ = CHARTS[chart]
+    return daily_progress(metric, exercise_like)
+
+@st.cache_data(max_entries=12, show_spinner=False)
+def chart_png(chart, version):
+    metric, _, title, ylabel = CHARTS[chart]
+    data = chart_data(chart, version)
+    fig, ax = plt.subplots()
+    try:
+        ax.plot(data['entry_date'], data[metric], marker='o')
+        ax.set_title(title)
+        ax.set_xlabel("Date")
+        ax.set_ylabel(ylabel)
+        ax.grid(True)
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=200, bbox_inches="tight")  # what st.pyplot would send
+        return buf.getvalue()
+    finally:
+        # pyplot keeps every open figure alive until it is closed
+        plt.close(fig)
+
+def show_chart(chart, version, renderer):
+    if renderer == "Vega-Lite":
+        # The browser draws it from the day-level rows; nothing is rasterized on the server
+        metric, _, title, ylabel = CHARTS[chart]
+        st.vega_lite_chart(chart_data(chart, version), {
+            "title": title,
+            "mark": {"type": "line", "point": True},
+            "encoding": {
+                "x": {"field": "entry_date", "type": "temporal", "title": "Date"},
+                "y": {"field": metric, "type": "quantitative", "title": ylabel},
+            },
+        }, width="stretch")
+    else:
+        st.image(chart_png(chart, version), width="stretch")
 
 # ---------- App ----------
 st.set_page_config(page_title="Pull-up Progress Tracker", layout="wide")
 st.title("🏋️ Pull-up Progress Tracker (Streamlit)")
 
-init_db()
-
 # Left: data entry
 with st.sidebar:
     st.header("Log workout")
@@ -62,21 +89,60 @@ with st.sidebar:
     dead_hang_seconds = st.number_input("Dead hang seconds (total)", min_value=0.0, value=0.0, step=0.5)
     negative_seconds = st.number_input("Negative descent seconds (avg)", min_value=0.0, value=0.0, step=0.5)
     notes = st.text_area("Notes", value="")
+    row = {
+        "entry_date": entry_date.isoformat(),
+        "workout_type": workout_type,
+        "exercise": exercise,
+        "sets": int(sets),
+        "reps": int(reps),
+        "assistance_level": assistance_level,
+        "dead_hang_seconds": float(dead_hang_seconds),
+        "negative_seconds": float(negative_seconds),
+        "notes": notes
+    }
     if st.button("Save entry"):
-        row = {
-            "entry_date": entry_date.isoformat(),
-            "workout_type": workout_type,
-            "exercise": exercise,
-            "sets": int(sets),
-            "reps": int(reps),
-            "assistance_level": assistance_level,
-            "dead_hang_seconds": float(dead_hang_seconds),
-            "negative_seconds": float(negative_seconds),
-            "notes": notes
-        }
         insert_row(row)
         st.success("Saved ✅")
 
+    # Several sets logged back to back are written together in one transaction
+    pending = st.session_state.setdefault("pending_rows", [])
+    col_add, col_save = st.columns(2)
+    if col_add.button("Add to batch"):
+        pending.append(row)
+    if col_save.button(f"Save batch ({len(pending)})", disabled=not pending):
+        saved = insert_rows(pending)
+        pending.clear()
+        st.success(f"Saved {saved} entries ✅")
+    elif pending:
+        st.caption(f"{len(pending)} entr{'y' if len(pending) == 1 else 'ies'} waiting to be saved")
+
+    # Bulk import: this tracker's own CSV export, or any CSV with its columns mapped below
+    st.header("Import CSV")
+    uploaded = st.file_uploader("Workout history", type="csv")
+    if uploaded is not None:
+        header = list(pd.read_csv(uploaded, nrows=0).columns)
+        uploaded.seek(0)
+        own_format = set(COLUMNS) <= set(header)
+        column_map = {}
+        with st.expander("Column mapping", expanded=not own_format):
+            for column in COLUMNS:
+                options = ["(none)"] + header
+                choice = st.selectbox(column, options, index=options.index(column) if column in header else 0,
+                                      key=f"import_{column}")
+                column_map[column] = None if choice == "(none)" else choice
+        if st.button("Import"):
+            try:
+                result = get_store().import_csv(uploaded, column_map)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.success(f"Imported {result['inserted']} of {result['read']} rows ✅")
+                if result["duplicates"]:
+                    st.caption(f"{result['duplicates']} rows were already logged and skipped")
+                if result["rejected"]:
+                    st.warning(f"{result['rejected']} rows rejected: "
+                               + "; ".join(f"line {line}: {problem}" for line, problem in result["problems"]))
+
 # Main: data table + visualizations + personal metrics
 st.subheader("Logged sessions")
 df = read_data()
@@ -98,52 +164,29 @@ else:
     st.markdown("### Progress charts")
     # convert column types properly
     df['entry_date'] = pd.to_datetime(df['entry_date']).dt.date
+    renderer = st.radio("Chart renderer", ["Image (matplotlib)", "Vega-Lite"], horizontal=True,
+                        help="Vega-Lite charts are drawn in the browser and are interactive")
+    # the charts read per-day maxima from the trigger-maintained summary table
+    version = get_store().version()
     # dead hang plot
-    if df['dead_hang_seconds'].sum() > 0:
-        fig, ax = plt.subplots()
-        hang = df.groupby('entry_date')['dead_hang_seconds'].max().reset_index()
-        ax.plot(hang['entry_date'], hang['dead_hang_seconds'], marker='o')
-        ax.set_title("Max dead hang (seconds) over time")
-        ax.set_xlabel("Date")
-        ax.set_ylabel("Seconds")
-        ax.grid(True)
-        st.pyplot(fig)
+    if chart_data("dead_hang", version)['dead_hang_seconds'].max() > 0:
+        show_chart("dead_hang", version, renderer)
     else:
         st.write("No dead hang data yet.")
 
     # negative plot
-    if df['negative_seconds'].sum() > 0:
-        fig2, ax2 = plt.subplots()
-        neg = df.groupby('entry_date')['negative_seconds'].max().reset_index()
-        ax2.plot(neg['entry_date'], neg['negative_seconds'], marker='o')
-        ax2.set_title("Max negative descent (seconds) over time")
-        ax2.set_xlabel("Date")
-        ax2.set_ylabel("Seconds")
-        ax2.grid(True)
-        st.pyplot(fig2)
+    if chart_data("negative", version)['negative_seconds'].max() > 0:
+        show_chart("negative", version, renderer)
     else:
         st.write("No negative data yet.")
 
-    # assisted reps (filter exercise contains "Assisted" or "Pull")
-    reps_df = df[df['exercise'].str.contains("Assisted|Pull|Chin", case=False, na=False)]
-    if not reps_df.empty:
-        fig3, ax3 = plt.subplots()
-        reps = reps_df.groupby('entry_date')['reps'].max().reset_index()
-        ax3.plot(reps['entry_date'], reps['reps'], marker='o')
-        ax3.set_title("Max assisted reps over time")
-        ax3.set_xlabel("Date")
-        ax3.set_ylabel("Reps")
-        ax3.grid(True)
-        st.pyplot(fig3)
+    if not chart_data("assisted_reps", version).empty:
+        show_chart("assisted_reps", version, renderer)
 
     # filter / export
     st.markdown("### Export & tools")
     csv = df.to_csv(index=False).encode('utf-8')
     st.download_button("Download CSV", csv, "pullup_progress.csv", "text/csv")
     if st.button("Clear all data (danger)"):
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("DELETE FROM workouts")
-        conn.commit()
-        conn.close()
-        st.experimental_rerun()
+        get_store().clear()
+        st.rerun()
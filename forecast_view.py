@@ -0,0 +1,123 @@
+import datetime
+
+import pandas as pd
+import streamlit as st
+
+import tracing
+from forecasting import ModelCache, batch_forecast, forecast_horizons, prophet_history
+from widgets import download_df_as_csv, profiling_enabled
+
+# Forecast sections of the dashboard. app.py imports this module where the
+# sections render, and Prophet and Plotly are only imported once a forecast is
+# actually drawn, so neither is paid for at startup.
+
+
+@st.cache_resource
+def get_model_cache():
+    return ModelCache(max_models=16)
+
+
+# The date range and horizon slider rerun only the forecast; the fitted models come from the model cache
+@st.fragment
+@tracing.traced("Forecast", profiling_enabled)
+def forecast_section(price_data, default_start_date, default_end_date):
+    st.markdown("---")
+    st.header("🔮 Stock Price Forecasting")
+
+    st.subheader("📆 Forecasting Date Range")
+    forecast_start = st.date_input("Start Date for Forecast", default_start_date, key="start_date_forecast")
+    forecast_end = st.date_input("End Date for Forecast", default_end_date, key="end_date_forecast")
+
+    if st.session_state.get("forecast_symbol"):
+        forecast_symbol = st.session_state.forecast_symbol
+        start_date_val = forecast_start
+        end_date_val = forecast_end
+
+
+        # Reuses the master window from memory when it covers the forecast range
+        with st.spinner(f"📈 Fetching data for {forecast_symbol} for forecasting..."):
+            forecast_data_raw = price_data.history(
+                forecast_symbol,
+                start_date_val,
+                end_date_val + datetime.timedelta(days=1)
+            )
+
+        if forecast_data_raw.empty:
+            st.error(f"No data found for {forecast_symbol} in the selected date range for forecasting.")
+        else:
+            # Ensure 'Close' column exists
+            if 'Close' not in forecast_data_raw.columns:
+                st.error(f"Error: 'Close' data not found for {forecast_symbol}.")
+            else:
+                # Create the forecast DataFrame correctly
+                forecast_df = forecast_data_raw[['Close']].copy()
+                forecast_df['ds'] = forecast_data_raw.index
+                forecast_df['y'] = forecast_df['Close']
+                forecast_df = forecast_df[['ds', 'y']]
+
+
+                # Fitted models are cached per symbol, training window and parameters,
+                # so only a change in the data refits Prophet
+                with st.spinner(f"⚙️ Training Prophet model for {forecast_symbol}..."), tracing.span("Prophet forecast"):
+                    forecasts = forecast_horizons(forecast_symbol, forecast_df, cache=get_model_cache())
+
+                st.subheader(f"📈 Price Forecast for {forecast_symbol}")
+
+                forecast_months = st.slider("Show Last N Months of Forecast", min_value=1, max_value=60, value=24) # Up to 5 years
+
+                import plotly.graph_objects as go
+
+                with tracing.span("Plotly figure", rows=len(forecast_df)):
+                    fig = go.Figure()
+                    fig.add_trace(go.Scatter(x=forecast_df['ds'], y=forecast_df['y'], mode='lines', name='Historical Close Price'))
+
+                    # Filter and add forecast traces
+                    for horizon_name, horizon_forecast in forecasts.items():
+                        horizon_filtered = horizon_forecast.tail(forecast_months)
+                        fig.add_trace(go.Scatter(x=horizon_filtered['ds'], y=horizon_filtered['yhat'], mode='lines', name=f'Forecast ({horizon_name})'))
+
+                    fig.update_layout(title='Historical Price vs. Forecasted Price',
+                                      xaxis_title='Date',
+                                      yaxis_title='Price',
+                                      legend_title='Forecast Horizon')
+                st.plotly_chart(fig, use_container_width=True)
+
+                st.info("Note: These forecasts are based on historical data and the Prophet model. They are not financial advice and should be interpreted with caution.")
+    else:
+        st.warning("No filters given!!")
+
+
+# --- Batch Forecasting ---
+@st.fragment
+@tracing.traced("Batch forecast", profiling_enabled)
+def batch_forecast_section(store, selected_symbols, all_symbols):
+    st.subheader("🗂️ Batch Forecast")
+    batch_universe = st.radio("Universe", ["Selected stocks", "All NSE symbols"], horizontal=True, key="batch_universe")
+    batch_workers = st.number_input("Worker processes", min_value=1, max_value=32, value=4, step=1, key="batch_workers")
+    if st.button("Run Batch Forecast"):
+        batch_symbols = selected_symbols if batch_universe == "Selected stocks" else all_symbols
+        with st.spinner(f"📥 Loading data for {len(batch_symbols)} symbol(s)..."):
+            # The forecast date inputs live in the forecast fragment; read their current values
+            batch_data = store.get(batch_symbols, st.session_state.start_date_forecast,
+                                   st.session_state.end_date_forecast + datetime.timedelta(days=1))
+        batch_histories = {s: prophet_history(batch_data[s]) for s in batch_symbols
+                           if not batch_data.empty and s in batch_data.columns.get_level_values(0)}
+
+        batch_progress = st.progress(0.0, text="Starting batch forecast...")
+        batch_table = st.empty()
+        batch_rows, batch_errors = [], []
+        for done, (symbol, row, error) in enumerate(batch_forecast(batch_histories, max_workers=int(batch_workers)), start=1):
+            if error:
+                batch_errors.append({"Symbol": symbol, "Error": error})
+            else:
+                batch_rows.append(row)
+                batch_table.dataframe(pd.DataFrame(batch_rows), use_container_width=True)
+            batch_progress.progress(done / len(batch_histories), text=f"Forecasted {done}/{len(batch_histories)}: {symbol}")
+
+        missing_batch_symbols = [s for s in batch_symbols if s not in batch_histories]
+        batch_errors += [{"Symbol": s, "Error": "no price data"} for s in missing_batch_symbols]
+        if batch_rows:
+            download_df_as_csv(pd.DataFrame(batch_rows), "batch_forecast.csv", label_prefix="📥 Download Batch")
+        if batch_errors:
+            with st.expander(f"⚠️ {len(batch_errors)} symbol(s) failed", expanded=False):
+                st.dataframe(pd.DataFrame(batch_errors), use_container_width=True)
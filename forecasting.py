@@ -0,0 +1,161 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import tracing
+
+# Forecast horizons shown on the dashboard, in days past the last historical bar
+HORIZONS = {"3 Months": 90, "6 Months": 180, "1 Year": 365, "5 Years": 365 * 5}
+
+
+class ModelCache:
+    """LRU of fitted Prophet models and their longest-horizon prediction."""
+
+    def __init__(self, max_models=16):
+        self.max_models = max_models
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_models:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def model_key(symbol, history, params):
+    # The data hash catches a refreshed last bar even when the window bounds stay the same
+    data_hash = int(pd.util.hash_pandas_object(history[["ds", "y"]], index=False).sum())
+    return (symbol, history["ds"].min(), history["ds"].max(), len(history), data_hash,
+            tuple(sorted(params.items())))
+
+
+def fit_and_predict(history, params, periods):
+    # Imported on the first fit: Prophet and its Stan backend take seconds to load
+    from prophet import Prophet
+
+    model = Prophet(**params)
+    model.fit(history)
+    # One predict over the longest horizon; the shorter ones are prefixes of it
+    forecast = model.predict(model.make_future_dataframe(periods=periods))
+    return model, forecast
+
+
+def forecast_horizons(symbol, history, cache=None, params=None, horizons=HORIZONS):
+    """Return {horizon name: forecast frame} for a ds/y history frame.
+
+    Each frame matches what model.predict(model.make_future_dataframe(days))
+    would return for that horizon.
+    """
+    params = params or {}
+    key = model_key(symbol, history, params)
+    cached = cache.get(key) if cache is not None else None
+    tracing.annotate(cache="miss" if cached is None else "hit", rows=len(history))
+    if cached is None:
+        with tracing.span("prophet.fit_predict", rows=len(history)):
+            cached = fit_and_predict(history, params, max(horizons.values()))
+        if cache is not None:
+            cache.put(key, cached)
+    _, forecast = cached
+
+    last_ds = history["ds"].max()
+    return {
+        name: forecast[forecast["ds"] <= last_ds + pd.Timedelta(days=days)].reset_index(drop=True)
+        for name, days in horizons.items()
+    }
+
+
+def prophet_history(bars):
+    """ds/y frame Prophet expects, from a single-symbol OHLCV frame."""
+    close = bars["Close"].dropna()
+    return pd.DataFrame({"ds": close.index, "y": close.to_numpy()})
+
+
+def forecast_summary(symbol, history, params=None, horizons=HORIZONS):
+    """Fit one symbol and reduce the prediction to a summary-table row.
+
+    Runs inside pool workers, so it must stay a module-level function.
+    """
+    _, forecast = fit_and_predict(history, params or {}, max(horizons.values()))
+    last_ds = history["ds"].max()
+    last_close = float(history["y"].iloc[-1])
+    row = {"Symbol": symbol, "Last Close": round(last_close, 2)}
+    for name, days in horizons.items():
+        yhat = float(forecast.loc[forecast["ds"] <= last_ds + pd.Timedelta(days=days), "yhat"].iloc[-1])
+        row[f"Forecast {name}"] = round(yhat, 2)
+        row[f"Change {name} (%)"] = round((yhat - last_close) / last_close * 100, 2)
+    return row
+
+
+def batch_forecast(histories, max_workers=None, params=None, horizons=HORIZONS, min_rows=30):
+    """Forecast many symbols on a process pool.
+
+    `histories` maps symbol -> ds/y frame. Yields (symbol, row, error) in
+    completion order so callers can stream results; a failure only affects
+    its own symbol.
+    """
+    pool = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {}
+        for symbol, history in histories.items():
+            if len(history) < min_rows:
+                yield symbol, None, f"only {len(history)} data points"
+                continue
+            futures[pool.submit(forecast_summary, symbol, history, params, horizons)] = symbol
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                yield symbol, future.result(), None
+            except Exception as e:
+                yield symbol, None, str(e)
+    finally:
+        # A caller that stops early (a Streamlit rerun) must not wait for the queued fits
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    # Nightly batch run: python forecasting.py RELIANCE.NS TCS.NS --workers 8 --output forecasts.csv
+    import argparse
+    import datetime
+
+    from price_store import PriceStore
+
+    parser = argparse.ArgumentParser(description="Batch Prophet forecasts for a list of symbols")
+    parser.add_argument("symbols", nargs="*", help="Symbols to forecast (defaults to --symbols-file)")
+    parser.add_argument("--symbols-file", help="File with one symbol per line")
+    parser.add_argument("--days", type=int, default=365, help="Days of history to train on")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default="forecasts.csv")
+    args = parser.parse_args()
+
+    symbols = list(args.symbols)
+    if args.symbols_file:
+        with open(args.symbols_file) as f:
+            symbols += [line.strip() for line in f if line.strip()]
+    if not symbols:
+        parser.error("no symbols given")
+
+    end = datetime.date.today() + datetime.timedelta(days=1)
+    data = PriceStore().get(symbols, end - datetime.timedelta(days=args.days), end)
+    histories = {s: prophet_history(data[s]) for s in symbols if s in data.columns.get_level_values(0)}
+
+    rows = []
+    for done, (symbol, row, error) in enumerate(batch_forecast(histories, max_workers=args.workers), start=1):
+        print(f"[{done}/{len(histories)}] {symbol}: {error or 'ok'}")
+        if row:
+            rows.append(row)
+    pd.DataFrame(rows).to_csv(args.output, index=False)
+    print(f"Wrote {len(rows)} forecasts to {args.output}")
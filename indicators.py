@@ -0,0 +1,203 @@
+import copy
+import threading
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from performance import wide_field
+
+# Technical indicators over the whole (date x symbol) panel at once.
+# Every indicator is written as "state in, rows in -> rows out, state out", so
+# a full-history computation and an update with freshly appended bars run the
+# same code: the engine carries EMA levels, Wilder averages, cumulative VWAP
+# sums and each symbol's last window-1 closes for rolling windows between calls.
+# Rolling windows skip a symbol's missing rows, so a date that only other
+# symbols traded on (a holiday, a suspension) does not blank its SMAs.
+
+
+def ewm(values, alpha, prev):
+    """Recursive EMA down the rows of `values`, seeded from `prev` (NaN = not started)."""
+    out = np.empty_like(values)
+    prev = prev.copy()
+    for t in range(len(values)):
+        x = values[t]
+        prev = np.where(np.isnan(prev), x, np.where(np.isnan(x), prev, prev + alpha * (x - prev)))
+        out[t] = prev
+    return out, prev
+
+
+def rolling_windows(values, tail, window):
+    """Sliding windows over each column's valid (non-NaN) values, continuing from `tail`.
+
+    `tail` holds each column's previous window-1 valid values, NaN-padded at
+    the top. Returns (windows, per_row, new tail): reduce `windows` along
+    axis 2, then per_row(reduced) gives one value per row of `values`, the
+    window ending at that row's value, or NaN where the row itself is NaN.
+    Positions before the start of history are NaN, so narrower windows can
+    be taken from the newest end of each one.
+    """
+    stacked = np.vstack([tail, values])
+    # Stable sort per column moving NaNs to the top, keeping valid values in date order
+    order = np.argsort(~np.isnan(stacked), axis=0, kind="stable")
+    compacted = np.take_along_axis(stacked, order, axis=0)
+    windows = sliding_window_view(compacted, window, axis=0)
+    # Window ending at each row's value: its compacted position minus (window - 1)
+    positions = np.argsort(order, axis=0)[window - 1:] - (window - 1)
+    missing = np.isnan(values)
+    positions[missing] = 0
+
+    def per_row(reduced):
+        out = np.take_along_axis(reduced, positions, axis=0)
+        out[missing] = np.nan
+        return out
+    return windows, per_row, compacted[len(compacted) - (window - 1):]
+
+
+class IndicatorEngine:
+    """SMA, EMA, RSI, MACD, Bollinger Bands, ATR and VWAP for every symbol of a panel."""
+
+    def __init__(self, sma_windows=(20, 50), ema_spans=(20,), rsi_period=14,
+                 macd_spans=(12, 26, 9), bollinger=(20, 2.0), atr_period=14):
+        self.sma_windows = tuple(sma_windows)
+        self.ema_spans = tuple(ema_spans)
+        self.rsi_period = rsi_period
+        self.macd_spans = macd_spans
+        self.bollinger = bollinger
+        self.atr_period = atr_period
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.symbols = None
+        self.index = pd.DatetimeIndex([])
+        self._results = {}
+        self._state = None
+        self._checkpoint = None
+
+    @property
+    def max_window(self):
+        return max(self.sma_windows + (self.bollinger[0],))
+
+    def _initial_state(self, n):
+        nan = np.full(n, np.nan)
+        fast, slow, _ = self.macd_spans
+        return {
+            "close_tail": np.full((self.max_window - 1, n), np.nan),
+            "prev_close": nan.copy(),
+            "ema": {span: nan.copy() for span in set(self.ema_spans + (fast, slow))},
+            "macd_signal": nan.copy(),
+            "avg_gain": nan.copy(),
+            "avg_loss": nan.copy(),
+            "atr": nan.copy(),
+            "cum_pv": np.zeros(n),
+            "cum_v": np.zeros(n),
+        }
+
+    def _step(self, state, high, low, close, volume):
+        """Indicator rows for a block of new bars; mutates `state` to carry forward."""
+        out = {}
+
+        windows, per_row, state["close_tail"] = rolling_windows(close, state["close_tail"], self.max_window)
+        for w in self.sma_windows:
+            out[f"SMA{w}"] = per_row(windows[:, :, -w:].mean(axis=2))
+        bb_window, bb_width = self.bollinger
+        mid = per_row(windows[:, :, -bb_window:].mean(axis=2))
+        std = per_row(windows[:, :, -bb_window:].std(axis=2))
+        out["BB_MID"], out["BB_UPPER"], out["BB_LOWER"] = mid, mid + bb_width * std, mid - bb_width * std
+
+        emas = {}
+        for span, prev in state["ema"].items():
+            emas[span], state["ema"][span] = ewm(close, 2 / (span + 1), prev)
+        for span in self.ema_spans:
+            out[f"EMA{span}"] = emas[span]
+        fast, slow, signal = self.macd_spans
+        macd = emas[fast] - emas[slow]
+        macd_signal, state["macd_signal"] = ewm(macd, 2 / (signal + 1), state["macd_signal"])
+        out["MACD"], out["MACD_SIGNAL"], out["MACD_HIST"] = macd, macd_signal, macd - macd_signal
+
+        prev_close = np.vstack([state["prev_close"][None, :], close[:-1]])
+        delta = close - prev_close
+        avg_gain, state["avg_gain"] = ewm(np.where(np.isnan(delta), np.nan, np.clip(delta, 0, None)),
+                                          1 / self.rsi_period, state["avg_gain"])
+        avg_loss, state["avg_loss"] = ewm(np.where(np.isnan(delta), np.nan, np.clip(-delta, 0, None)),
+                                          1 / self.rsi_period, state["avg_loss"])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[f"RSI{self.rsi_period}"] = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+        out[f"ATR{self.atr_period}"], state["atr"] = ewm(true_range, 1 / self.atr_period, state["atr"])
+
+        typical = (high + low + close) / 3
+        pv = np.nan_to_num(typical * volume)
+        cum_pv = state["cum_pv"] + np.cumsum(pv, axis=0)
+        cum_v = state["cum_v"] + np.cumsum(np.nan_to_num(volume), axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out["VWAP"] = np.where(cum_v > 0, cum_pv / cum_v, np.nan)
+        state["cum_pv"], state["cum_v"] = cum_pv[-1], cum_v[-1]
+
+        # Carry the last close per symbol, skipping gaps
+        for t in range(len(close)):
+            state["prev_close"] = np.where(np.isnan(close[t]), state["prev_close"], close[t])
+        return out
+
+    def update(self, bars):
+        """Append new bars ((symbol, field) frame, dates after self.index) and return their indicator rows."""
+        if self.symbols is None:
+            self.symbols = list(dict.fromkeys(bars.columns.get_level_values(0)))
+            self._state = self._initial_state(len(self.symbols))
+        if bars.empty:
+            return {}
+        fields = [wide_field(bars, f, self.symbols).to_numpy(dtype=float) for f in ("High", "Low", "Close", "Volume")]
+
+        # Snapshot the state before the last bar so sync() can recompute a still-forming bar
+        head = self._step(self._state, *(f[:-1] for f in fields)) if len(bars) > 1 else {}
+        self._checkpoint = copy.deepcopy(self._state)
+        last = self._step(self._state, *(f[-1:] for f in fields))
+        new_rows = {name: np.vstack([head[name], values]) if head else values for name, values in last.items()}
+
+        new_frames = {name: pd.DataFrame(values, index=bars.index, columns=self.symbols)
+                      for name, values in new_rows.items()}
+        for name, frame in new_frames.items():
+            self._results[name] = pd.concat([self._results[name], frame]) if name in self._results else frame
+        self.index = self.index.append(bars.index)
+        return new_frames
+
+    def sync(self, frame):
+        """Bring the engine up to date with `frame`, touching only the last known bar and newer ones.
+
+        Rebuilds from scratch if the frame no longer extends what was processed:
+        different symbols, or dates that are not a continuation of the
+        processed ones (another start date, or an end date moved earlier).
+        """
+        with self._lock:
+            frame_symbols = list(dict.fromkeys(frame.columns.get_level_values(0)))
+            extends = len(frame) >= len(self.index) and frame.index[:len(self.index)].equals(self.index)
+            if (self.symbols is not None and frame_symbols != self.symbols) or not extends:
+                self._reset()
+            if not len(self.index):
+                return self.update(frame)
+
+            last_seen = self.index[-1]
+            # The last processed bar may have changed since (today's bar), so roll it back and redo it
+            self._state = self._checkpoint
+            self.index = self.index[:-1]
+            for name in self._results:
+                self._results[name] = self._results[name].iloc[:-1]
+            return self.update(frame[frame.index >= last_seen])
+
+    # Readers take the lock too: another session may be syncing the same engine
+    def indicator(self, name):
+        """Full-history date x symbol frame for one indicator, e.g. 'RSI14'."""
+        with self._lock:
+            return self._results[name]
+
+    def for_symbol(self, symbol):
+        """date x indicator frame for one symbol."""
+        with self._lock:
+            return pd.DataFrame({name: frame[symbol] for name, frame in self._results.items()})
+
+    def latest(self, name):
+        """Last value of an indicator for every symbol."""
+        with self._lock:
+            return self._results[name].ffill().iloc[-1]
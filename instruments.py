@@ -0,0 +1,91 @@
+import bisect
+import datetime
+import json
+import os
+import threading
+
+# Kite instrument dumps are tens of thousands of rows for NFO/MCX and only
+# change once a day, so each exchange's dump is saved to disk with the date it
+# was fetched and turned into a hash index plus a sorted symbol list for
+# prefix search.
+
+DEFAULT_INSTRUMENT_DIR = os.environ.get("INSTRUMENT_CACHE_DIR", ".instrument_cache")
+
+
+class InstrumentIndex:
+    def __init__(self, rows, as_of=None):
+        self.as_of = as_of or datetime.date.today()
+        self._by_key = {(row["exchange"], row["tradingsymbol"]): row for row in rows}
+        self._sorted = {}
+        for exchange, tradingsymbol in self._by_key:
+            self._sorted.setdefault(exchange, []).append(tradingsymbol)
+        for symbols in self._sorted.values():
+            symbols.sort()
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def __contains__(self, key):
+        return key in self._by_key
+
+    def get(self, exchange, tradingsymbol):
+        return self._by_key.get((exchange, tradingsymbol))
+
+    def token(self, exchange, tradingsymbol):
+        row = self._by_key.get((exchange, tradingsymbol))
+        return row["instrument_token"] if row else None
+
+    def search(self, exchange, prefix, limit=10):
+        """Trading symbols on `exchange` starting with `prefix`, in sorted order."""
+        symbols = self._sorted.get(exchange, [])
+        start = bisect.bisect_left(symbols, prefix)
+        matches = []
+        for symbol in symbols[start:start + limit]:
+            if not symbol.startswith(prefix):
+                break
+            matches.append(symbol)
+        return matches
+
+
+class InstrumentStore:
+    """Per-exchange instrument indexes, refreshed from the broker once a day."""
+
+    def __init__(self, cache_dir=DEFAULT_INSTRUMENT_DIR):
+        self.cache_dir = cache_dir
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _path(self, exchange):
+        return os.path.join(self.cache_dir, f"instruments_{exchange}.json")
+
+    def _load_disk(self, exchange, today):
+        try:
+            with open(self._path(exchange)) as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if payload.get("as_of") != today.isoformat():
+            return None
+        return InstrumentIndex(payload["rows"], as_of=today)
+
+    def _save_disk(self, exchange, rows, today):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self._path(exchange)}.tmp"
+        with open(tmp_path, "w") as f:
+            # expiry comes back as a date; str() keeps it readable
+            json.dump({"as_of": today.isoformat(), "rows": rows}, f, default=str)
+        os.replace(tmp_path, self._path(exchange))
+
+    def index(self, kite, exchange):
+        """Today's index for `exchange`: memory, then disk, then kite.instruments()."""
+        today = datetime.date.today()
+        with self._lock:
+            index = self._indexes.get(exchange)
+            if index is None or index.as_of != today:
+                index = self._load_disk(exchange, today)
+                if index is None:
+                    rows = kite.instruments(exchange)
+                    self._save_disk(exchange, rows, today)
+                    index = InstrumentIndex(rows, as_of=today)
+                self._indexes[exchange] = index
+            return index
@@ -0,0 +1,126 @@
+import itertools
+import threading
+import time
+
+# In-process stand-in for the Kite Connect API, for tests and for running the
+# trading section without a broker account (set KITE_MOCK=1). Orders move
+# through OPEN to COMPLETE after `fill_delay_seconds`, market orders fill at
+# the instrument's last price, and holdings follow the fills.
+
+
+class MockKiteConnect:
+    TRANSACTION_TYPE_BUY = "BUY"
+    TRANSACTION_TYPE_SELL = "SELL"
+    VARIETY_REGULAR = "regular"
+    ORDER_TYPE_MARKET = "MARKET"
+    ORDER_TYPE_LIMIT = "LIMIT"
+    PRODUCT_CNC = "CNC"
+    PRODUCT_MIS = "MIS"
+
+    def __init__(self, api_key=None, instruments=None, holdings=None, fill_delay_seconds=0.5,
+                 reject_symbols=()):
+        self.api_key = api_key
+        self.access_token = None
+        self._redirect_url = "http://localhost:8501/"
+        self.fill_delay_seconds = fill_delay_seconds
+        self.reject_symbols = set(reject_symbols)
+        self._lock = threading.Lock()
+        self._order_ids = itertools.count(250000000000001)
+        self._orders = {}
+        self._instruments = instruments or [
+            {"instrument_token": 738561 + i, "exchange": "NSE", "tradingsymbol": symbol, "name": symbol,
+             "last_price": price, "lot_size": 1, "tick_size": 0.05, "instrument_type": "EQ", "segment": "NSE"}
+            for i, (symbol, price) in enumerate([("RELIANCE", 2900.0), ("TCS", 3900.0), ("INFY", 1500.0),
+                                                 ("HDFCBANK", 1600.0), ("ITC", 430.0), ("SBIN", 800.0)])
+        ]
+        self._holdings = {(h["exchange"], h["tradingsymbol"]): dict(h) for h in (holdings or [
+            {"exchange": "NSE", "tradingsymbol": "INFY", "quantity": 10, "average_price": 1400.0},
+            {"exchange": "NSE", "tradingsymbol": "ITC", "quantity": 50, "average_price": 440.0},
+        ])}
+
+    # ---------- session ----------
+    def login_url(self):
+        return f"https://kite.zerodha.com/connect/login?api_key={self.api_key}&v=3"
+
+    def set_access_token(self, access_token):
+        self.access_token = access_token
+
+    def generate_session(self, request_token, api_secret):
+        self.access_token = f"mock-{request_token}"
+        return {"access_token": self.access_token, "user_name": "Mock User"}
+
+    def profile(self):
+        return {"user_name": "Mock User", "user_id": "MK0001"}
+
+    def margins(self):
+        return {"equity": {"available": {"live_margin": 100000.0}}}
+
+    # ---------- market data ----------
+    def instruments(self, exchange=None):
+        return [dict(i) for i in self._instruments if exchange is None or i["exchange"] == exchange]
+
+    def _instrument(self, exchange, tradingsymbol):
+        return next((i for i in self._instruments if i["exchange"] == exchange and i["tradingsymbol"] == tradingsymbol), None)
+
+    def ltp(self, instruments):
+        quotes = {}
+        for key in instruments:
+            exchange, tradingsymbol = key.split(":", 1)
+            instrument = self._instrument(exchange, tradingsymbol)
+            if instrument:
+                quotes[key] = {"instrument_token": instrument["instrument_token"], "last_price": instrument["last_price"]}
+        return quotes
+
+    # ---------- portfolio ----------
+    def holdings(self):
+        with self._lock:
+            self._settle()
+            return [dict(h, last_price=self._instrument(*k)["last_price"] if self._instrument(*k) else h["average_price"])
+                    for k, h in self._holdings.items() if h["quantity"] > 0]
+
+    def positions(self):
+        return {"net": [], "day": []}
+
+    # ---------- orders ----------
+    def place_order(self, variety, exchange, tradingsymbol, transaction_type, quantity, product, order_type,
+                    price=None, **kwargs):
+        order_id = str(next(self._order_ids))
+        rejected = tradingsymbol in self.reject_symbols or self._instrument(exchange, tradingsymbol) is None
+        with self._lock:
+            self._orders[order_id] = {
+                "order_id": order_id, "exchange": exchange, "tradingsymbol": tradingsymbol,
+                "transaction_type": transaction_type, "quantity": quantity, "product": product,
+                "order_type": order_type, "price": price, "placed_at": time.time(),
+                "status": "REJECTED" if rejected else "OPEN",
+                "status_message": "Instrument rejected by mock broker" if rejected else None,
+                "filled_quantity": 0, "pending_quantity": 0 if rejected else quantity, "average_price": 0.0,
+            }
+        return order_id
+
+    def _settle(self):
+        # Caller holds the lock; fill every OPEN order whose delay has passed
+        now = time.time()
+        for order in self._orders.values():
+            if order["status"] != "OPEN" or now - order["placed_at"] < self.fill_delay_seconds:
+                continue
+            instrument = self._instrument(order["exchange"], order["tradingsymbol"])
+            fill_price = order["price"] or instrument["last_price"]
+            order.update(status="COMPLETE", filled_quantity=order["quantity"], pending_quantity=0, average_price=fill_price)
+            key = (order["exchange"], order["tradingsymbol"])
+            holding = self._holdings.setdefault(key, {"exchange": key[0], "tradingsymbol": key[1], "quantity": 0, "average_price": 0.0})
+            if order["transaction_type"] == self.TRANSACTION_TYPE_BUY:
+                total = holding["quantity"] + order["quantity"]
+                holding["average_price"] = (holding["average_price"] * holding["quantity"] + fill_price * order["quantity"]) / total
+                holding["quantity"] = total
+            else:
+                holding["quantity"] -= order["quantity"]
+
+    def order_history(self, order_id):
+        with self._lock:
+            self._settle()
+            return [dict(self._orders[order_id])]
+
+    def orders(self):
+        with self._lock:
+            self._settle()
+            return [dict(o) for o in self._orders.values()]
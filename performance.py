@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+# Columnar versions of the per-symbol loops in the dashboard. Everything works
+# on wide (date x symbol) Close/Volume frames taken from the (symbol, field)
+# MultiIndex layout, one NumPy pass for all symbols.
+
+RECOMMENDATIONS = ["Strong Buy", "Buy", "Strong Sell", "Sell"]
+
+
+def wide_field(frame, field, symbols=None):
+    """date x symbol frame for one OHLCV field of a (symbol, field) frame."""
+    wide = frame.xs(field, axis=1, level=1)
+    if symbols is not None:
+        wide = wide.reindex(columns=list(symbols))
+    return wide
+
+
+def first_last_valid(values):
+    """Row positions of the first and last non-NaN value in each column, and the count."""
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=0)
+    first = valid.argmax(axis=0)
+    last = len(values) - 1 - valid[::-1].argmax(axis=0)
+    return first, last, count
+
+
+def recommend(change, strong_buy, buy, sell, strong_sell):
+    """Vectorized Strong Buy / Buy / Hold / Sell / Strong Sell labels for % changes."""
+    change = np.asarray(change, dtype=float)
+    conditions = [change <= -strong_buy, change <= -buy, change >= strong_sell, change >= sell]
+    return np.select(conditions, RECOMMENDATIONS, default="Hold")
+
+
+def performance_summary(frame, symbols, strong_buy, buy, sell, strong_sell):
+    """Return (summary frame, symbols with fewer than two closes).
+
+    Same columns and rounding as the dashboard's performance table.
+    """
+    symbols = list(symbols)
+    if frame.empty:
+        return pd.DataFrame(columns=["Symbol", "Start Price", "End Price", "Change (%)", "Avg Volume", "Recommendation"]), symbols
+    close = wide_field(frame, "Close", symbols).to_numpy(dtype=float)
+    volume = wide_field(frame, "Volume", symbols).to_numpy(dtype=float)
+
+    first, last, count = first_last_valid(close)
+    cols = np.arange(close.shape[1])
+    start_price = close[first, cols]
+    end_price = close[last, cols]
+    change = (end_price - start_price) / start_price * 100
+
+    volume_count = (~np.isnan(volume)).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_volume = np.nansum(volume, axis=0) / volume_count
+
+    enough = count >= 2
+    summary = pd.DataFrame({
+        "Symbol": np.array(symbols, dtype=object)[enough],
+        "Start Price": np.round(start_price[enough], 2),
+        "End Price": np.round(end_price[enough], 2),
+        "Change (%)": np.round(change[enough], 2),
+        "Avg Volume": [f"{v:,.0f}" for v in avg_volume[enough]],
+        "Recommendation": recommend(change[enough], strong_buy, buy, sell, strong_sell),
+    })
+    skipped = [s for s, ok in zip(symbols, enough) if not ok]
+    return summary, skipped
+
+
+def normalize_to_start(close):
+    """Scale every column of a wide close frame to 100 at its first valid value."""
+    return close / close.bfill().iloc[0] * 100
+
+
+def sell_rule_scan(holdings, last_prices, sell_pct=5.0, stop_loss_pct=None):
+    """Evaluate the sell rule for every holding at once and rank the result.
+
+    `holdings` is the list returned by kite.holdings(); `last_prices` maps
+    "EXCHANGE:SYMBOL" to LTP. SELL when LTP >= average price * (1 + sell_pct%),
+    STOP-LOSS when LTP <= average price * (1 - stop_loss_pct%), else HOLD.
+    """
+    columns = ["Symbol", "Exchange", "Quantity", "Avg Price", "LTP", "Sell Target",
+               "Gain (%)", "To Target (%)", "Action"]
+    if not holdings:
+        return pd.DataFrame(columns=columns)
+    table = pd.DataFrame(holdings)
+    keys = table["exchange"] + ":" + table["tradingsymbol"]
+    avg = table["average_price"].to_numpy(dtype=float)
+    ltp = keys.map(last_prices).to_numpy(dtype=float)
+    target = avg * (1 + sell_pct / 100)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        gain = (ltp - avg) / avg * 100
+        to_target = (target - ltp) / ltp * 100
+
+    conditions = [np.isnan(ltp), ltp >= target]
+    choices = ["NO QUOTE", "SELL"]
+    if stop_loss_pct:
+        conditions.append(ltp <= avg * (1 - stop_loss_pct / 100))
+        choices.append("STOP-LOSS")
+    result = pd.DataFrame({
+        "Symbol": table["tradingsymbol"], "Exchange": table["exchange"], "Quantity": table["quantity"],
+        "Avg Price": np.round(avg, 2), "LTP": ltp, "Sell Target": np.round(target, 2),
+        "Gain (%)": np.round(gain, 2), "To Target (%)": np.round(to_target, 2),
+        "Action": np.select(conditions, choices, default="HOLD"),
+    })
+    # Actionable rows first, then by how far past (or close to) the target each holding is
+    priority = result["Action"].map({"SELL": 0, "STOP-LOSS": 1, "HOLD": 2, "NO QUOTE": 3})
+    return result.assign(_p=priority).sort_values(["_p", "Gain (%)"], ascending=[True, False]).drop(columns="_p").reset_index(drop=True)
@@ -0,0 +1,345 @@
+import datetime
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import tracing
+
+# On-disk OHLCV cache that sits in front of yf.download.
+# Bars are stored per (symbol, date) in SQLite; a coverage table remembers which
+# date range has already been fetched for each symbol so that only the missing
+# gaps (usually just the newest trading days) go back to the data source.
+# yfinance often fails silently, returning no rows or all-NaN columns for a
+# throttled or bad ticker, so coverage only grows for symbols that actually
+# came back with bars. Empty symbols are reported (and retried only when the
+# response hints at throttling rather than a dead ticker), and only
+# remembered for a short while (empty_ttl_seconds) before being asked again.
+
+DEFAULT_DB_PATH = os.environ.get("PRICE_STORE_PATH", "price_cache.db")
+OHLCV_FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+_DB_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+_YF_DOWNLOAD_LOCK = threading.Lock()
+
+
+def _yf_download(*args, **kwargs):
+    # yf.download keeps per-call results in module globals, so concurrent calls
+    # from several threads can mix up each other's frames. Each call still
+    # downloads its symbols on yfinance's own thread pool.
+    import yfinance as yf
+    with _YF_DOWNLOAD_LOCK:
+        return yf.download(*args, **kwargs)
+
+
+def _to_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+def normalize_download(raw, symbols):
+    """Return yf.download output as a (symbol, field) MultiIndex frame.
+
+    Handles the single-symbol flat layout, group_by='ticker' (symbol first)
+    and the newer (field, symbol) layout yfinance returns by default.
+    """
+    if raw is None or raw.empty:
+        return pd.DataFrame()
+    df = raw.copy()
+    if isinstance(df, pd.Series):
+        df = df.to_frame()
+    if isinstance(df.columns, pd.MultiIndex):
+        level0 = set(df.columns.get_level_values(0))
+        if not level0.intersection(symbols) and set(df.columns.get_level_values(1)).intersection(symbols):
+            df = df.swaplevel(0, 1, axis=1)
+    else:
+        # Flat columns only happen for a single symbol
+        df.columns = pd.MultiIndex.from_product([[symbols[0]], df.columns])
+    df.index = pd.to_datetime(df.index)
+    if df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+    df.index.name = "Date"
+    return df
+
+
+class PriceStore:
+    def __init__(self, db_path=DEFAULT_DB_PATH, fetch=None, live_ttl_seconds=15 * 60,
+                 retries=3, backoff_seconds=1.0, empty_ttl_seconds=5 * 60):
+        # fetch has the yf.download signature; pass a fake for offline use
+        self.fetch = fetch or _yf_download
+        self.live_ttl_seconds = live_ttl_seconds
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.empty_ttl_seconds = empty_ttl_seconds
+        self._lock = threading.Lock()
+        # (symbol, gap_start, gap_end) -> when a fetch last came back empty for it
+        self._empty = {}
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS bars (
+                symbol TEXT NOT NULL,
+                date TEXT NOT NULL,
+                open REAL, high REAL, low REAL, close REAL, volume REAL,
+                PRIMARY KEY (symbol, date)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS coverage (
+                symbol TEXT PRIMARY KEY,
+                start TEXT NOT NULL,
+                end TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    # ---------- gap detection ----------
+    def _coverage(self, symbols):
+        placeholders = ",".join("?" * len(symbols))
+        rows = self._conn.execute(
+            f"SELECT symbol, start, end, fetched_at FROM coverage WHERE symbol IN ({placeholders})",
+            list(symbols)).fetchall()
+        return {r[0]: (datetime.date.fromisoformat(r[1]), datetime.date.fromisoformat(r[2]), r[3]) for r in rows}
+
+    def missing_ranges(self, symbols, start, end, now=None):
+        """Map (gap_start, gap_end) -> [symbols] for every range not yet on disk. `end` is exclusive."""
+        start, end = _to_date(start), _to_date(end)
+        now = now or datetime.datetime.now()
+        today = now.date()
+        with self._lock:
+            coverage = self._coverage(symbols)
+            empty = dict(self._empty)
+        gaps = {}
+
+        def add(gap, symbol):
+            # Weekends never have bars; a recent empty answer is not asked again until it expires
+            if np.busday_count(*gap) == 0:
+                return
+            if now.timestamp() - empty.get((symbol, *gap), -np.inf) < self.empty_ttl_seconds:
+                return
+            gaps.setdefault(gap, []).append(symbol)
+
+        for symbol in symbols:
+            if symbol not in coverage:
+                add((start, end), symbol)
+                continue
+            cov_start, cov_end, fetched_at = coverage[symbol]
+            if start < cov_start:
+                add((start, cov_start), symbol)
+            if end > cov_end:
+                # Today's bar is still forming, so the open end is only trusted for live_ttl_seconds
+                stale = cov_end < today or now.timestamp() - fetched_at > self.live_ttl_seconds
+                if stale:
+                    add((cov_end, end), symbol)
+        return gaps
+
+    # ---------- writes ----------
+    def _write(self, frame, symbols, start, end, now):
+        """Persist the bars in `frame`; only symbols that have bars get their coverage extended."""
+        today = now.date()
+        rows, written = [], []
+        for symbol in symbols:
+            if frame.empty or symbol not in frame.columns.get_level_values(0):
+                continue
+            bars = frame[symbol].reindex(columns=OHLCV_FIELDS).dropna(how="all")
+            if bars.empty:
+                continue
+            dates = bars.index.strftime("%Y-%m-%d")
+            # SQLite stores NaN as NULL
+            values = bars.astype(float).itertuples(index=False, name=None)
+            rows.extend((symbol, d, *v) for d, v in zip(dates, values))
+            written.append(symbol)
+
+        # Days before today are final; today stays open so it is refreshed later
+        covered_end = min(end, today)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO bars (symbol, date, open, high, low, close, volume) VALUES (?,?,?,?,?,?,?)",
+                rows)
+            for symbol in set(symbols) - set(written):
+                self._empty[(symbol, start, end)] = now.timestamp()
+            for symbol in written:
+                self._empty.pop((symbol, start, end), None)
+                existing = self._coverage([symbol]).get(symbol)
+                new_start, new_end = start, covered_end
+                if existing:
+                    new_start = min(existing[0], start)
+                    new_end = max(existing[1], covered_end)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO coverage (symbol, start, end, fetched_at) VALUES (?,?,?,?)",
+                    (symbol, new_start.isoformat(), new_end.isoformat(), now.timestamp()))
+
+    def _fetch(self, symbols, start, end, retry_empty=True, known=()):
+        """Download [start, end) for `symbols`, retrying with exponential backoff.
+
+        Exceptions are always retried. Symbols that come back without bars are
+        only retried (if `retry_empty`) when there is a sign of throttling: an
+        earlier attempt raised, or the rest of the batch came back and the
+        symbol is in `known` (has had bars before). An empty answer on its own
+        is what yfinance gives for a delisted ticker, and is not worth the
+        backoff. Returns the normalized frame, the symbols still without bars,
+        and the last error seen.
+        """
+        frames, pending, given_up, error, raised = [], list(symbols), [], None, False
+        for attempt in range(self.retries + 1):
+            try:
+                raw = self.fetch(pending, start=start, end=end, group_by="ticker", progress=False)
+            except Exception as e:
+                if attempt == self.retries and not frames:
+                    raise
+                error, raised = str(e), True
+            else:
+                frame = normalize_download(raw, pending)
+                returned = [] if frame.empty else [
+                    s for s in pending
+                    if s in frame.columns.get_level_values(0) and frame[s].notna().to_numpy().any()]
+                if returned:
+                    frames.append(frame[returned])
+                missing = [s for s in pending if s not in returned]
+                if missing:
+                    error = "no data returned"
+                if not retry_empty:
+                    pending = []
+                elif raised:
+                    pending = missing
+                else:
+                    pending = [s for s in missing if frames and s in known]
+                given_up += [s for s in missing if s not in pending]
+                if not pending:
+                    break
+            if attempt < self.retries:
+                time.sleep(self.backoff_seconds * 2 ** attempt)
+        frame = pd.concat(frames, axis=1) if frames else pd.DataFrame()
+        return frame, given_up + pending, error
+
+    def refresh(self, symbols, start, end):
+        """Fetch and persist only the gaps missing for `symbols` in [start, end).
+
+        Returns {symbol: error} for symbols the data source gave no bars for.
+        """
+        now = datetime.datetime.now()
+        gaps = self.missing_ranges(symbols, start, end, now)
+        tracing.annotate(cache="miss" if gaps else "hit")
+        failed = {}
+        for (gap_start, gap_end), gap_symbols in gaps.items():
+            # A gap holding only today may be empty simply because the market has not opened
+            has_closed_days = np.busday_count(gap_start, min(gap_end, now.date())) > 0
+            with self._lock:
+                known = set(self._coverage(gap_symbols))
+            with tracing.span("yfinance.download", symbols=len(gap_symbols)) as span:
+                frame, missing, error = self._fetch(gap_symbols, gap_start, gap_end,
+                                                    retry_empty=has_closed_days, known=known)
+                span.set(rows=len(frame), missing=len(missing))
+            self._write(frame, gap_symbols, gap_start, gap_end, now)
+            if has_closed_days:
+                failed.update((symbol, error) for symbol in missing)
+        return failed
+
+    # ---------- reads ----------
+    def read(self, symbols, start, end):
+        """Return cached bars in [start, end) as a (symbol, field) MultiIndex frame."""
+        start, end = _to_date(start), _to_date(end)
+        placeholders = ",".join("?" * len(symbols))
+        with self._lock:
+            long_df = pd.read_sql_query(
+                f"SELECT symbol, date, {', '.join(_DB_COLUMNS)} FROM bars "
+                f"WHERE symbol IN ({placeholders}) AND date >= ? AND date < ? ORDER BY date",
+                self._conn, params=[*symbols, start.isoformat(), end.isoformat()])
+        if long_df.empty:
+            return pd.DataFrame()
+        long_df.columns = ["symbol", "Date"] + OHLCV_FIELDS
+        long_df["Date"] = pd.to_datetime(long_df["Date"])
+        wide = long_df.pivot(index="Date", columns="symbol", values=OHLCV_FIELDS)
+        wide = wide.swaplevel(0, 1, axis=1)
+        ordered = [(s, f) for s in symbols for f in OHLCV_FIELDS if (s, f) in wide.columns]
+        return wide[ordered]
+
+    def get(self, symbols, start, end):
+        """Fill any missing gaps from the data source, then read from disk."""
+        return self._get_reporting(list(dict.fromkeys(symbols)), start, end)[0]
+
+    def _get_reporting(self, symbols, start, end):
+        with tracing.span("PriceStore.get", symbols=len(symbols)) as span:
+            failed = self.refresh(symbols, start, end)
+            frame = self.read(symbols, start, end)
+            span.set(rows=len(frame))
+        return frame, failed
+
+    def get_chunked(self, symbols, start, end, chunk_size=25, max_workers=4):
+        """Load a large universe in bounded concurrent chunks.
+
+        Yields (chunk symbols, frame, {symbol: error}) as each chunk finishes,
+        so callers can show the first rows long before the whole universe is
+        in. Symbols the data source returned nothing for are in the errors
+        even when the call itself succeeded.
+
+        The yf.download calls themselves are serialized by _YF_DOWNLOAD_LOCK
+        (yfinance downloads each call's symbols on its own thread pool);
+        `max_workers` only overlaps one chunk's download with other chunks'
+        gap checks, disk writes and reads.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        chunks = [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {pool.submit(self._get_reporting, chunk, start, end): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    frame, failed = future.result()
+                    yield chunk, frame, failed
+                except Exception as e:
+                    yield chunk, pd.DataFrame(), {symbol: str(e) for symbol in chunk}
+        finally:
+            # A caller that stops early (a Streamlit rerun) must not wait for the queued chunks
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def invalidate(self, symbols=None):
+        with self._lock, self._conn:
+            if symbols is None:
+                self._conn.execute("DELETE FROM bars")
+                self._conn.execute("DELETE FROM coverage")
+            else:
+                placeholders = ",".join("?" * len(symbols))
+                self._conn.execute(f"DELETE FROM bars WHERE symbol IN ({placeholders})", list(symbols))
+                self._conn.execute(f"DELETE FROM coverage WHERE symbol IN ({placeholders})", list(symbols))
+
+
+class PriceData:
+    """Price access shared by every section of the dashboard.
+
+    Holds the frame loaded for the master window and answers narrower
+    requests from memory; anything outside that window goes through the
+    store, which only downloads what is not already on disk.
+    """
+
+    def __init__(self, store, frame, start, end):
+        self.store = store
+        self.frame = frame
+        self.start, self.end = _to_date(start), _to_date(end)
+
+    @classmethod
+    def load(cls, store, symbols, start, end):
+        return cls(store, store.get(symbols, start, end), start, end)
+
+    def history(self, symbol, start, end):
+        """Single-symbol OHLCV frame for [start, end) with flat columns."""
+        start, end = _to_date(start), _to_date(end)
+        in_memory = (not self.frame.empty
+                     and symbol in self.frame.columns.get_level_values(0)
+                     and self.start <= start and end <= self.end)
+        if in_memory:
+            bars = self.frame[symbol]
+        else:
+            bars = self.store.get([symbol], start, end)
+            if bars.empty:
+                return pd.DataFrame(columns=OHLCV_FIELDS)
+            bars = bars[symbol]
+        window = (bars.index >= pd.Timestamp(start)) & (bars.index < pd.Timestamp(end))
+        return bars[window].dropna(how="all")
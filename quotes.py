@@ -0,0 +1,148 @@
+import random
+import threading
+import time
+
+# Long-lived last-price/depth table fed by a tick stream. The dashboard reads
+# quotes from memory instead of calling kite.ltp() on every rerun. Feeds share
+# one small interface (start(on_ticks), subscribe(tokens), stop()) so the
+# broker's WebSocket ticker and the local simulator are interchangeable.
+# Each stored quote records when it arrived and whether it came from a tick or
+# a REST seed, so callers can tell a live price from one the stream left behind.
+
+
+class QuoteService:
+    def __init__(self, feed, max_age_seconds=5.0):
+        self.feed = feed
+        self.max_age_seconds = max_age_seconds
+        self._quotes = {}
+        self._subscribed = set()
+        self._lock = threading.Lock()
+        self.feed.start(self._on_ticks)
+
+    def _on_ticks(self, ticks):
+        now = time.time()
+        with self._lock:
+            for tick in ticks:
+                self._quotes[tick["instrument_token"]] = {**tick, "received_at": now, "source": "tick"}
+
+    def _is_fresh(self, quote, now):
+        return quote["source"] == "tick" and now - quote["received_at"] <= self.max_age_seconds
+
+    def subscribe(self, tokens):
+        with self._lock:
+            new_tokens = [t for t in tokens if t not in self._subscribed]
+            self._subscribed.update(new_tokens)
+        if new_tokens:
+            self.feed.subscribe(new_tokens)
+
+    def seed(self, token, last_price):
+        """Fill a quote from one kite.ltp call while no fresh tick is on hand.
+
+        A fresh tick is never overwritten, so a seed racing the stream loses.
+        """
+        now = time.time()
+        with self._lock:
+            current = self._quotes.get(token)
+            if current is None or not self._is_fresh(current, now):
+                self._quotes[token] = {"instrument_token": token, "last_price": last_price,
+                                       "received_at": now, "source": "seed"}
+
+    def quote(self, token):
+        with self._lock:
+            return self._quotes.get(token)
+
+    def age(self, token, now=None):
+        """Seconds since the quote for `token` arrived, or None if there is none."""
+        quote = self.quote(token)
+        return (now or time.time()) - quote["received_at"] if quote else None
+
+    def is_fresh(self, token, now=None):
+        """True if the quote came from a tick within the last `max_age_seconds`."""
+        quote = self.quote(token)
+        return quote is not None and self._is_fresh(quote, now or time.time())
+
+    def last_price(self, token):
+        quote = self.quote(token)
+        return quote["last_price"] if quote else None
+
+    def stop(self):
+        self.feed.stop()
+
+
+class KiteTickerFeed:
+    """Full-mode (price + depth) ticks from Kite's WebSocket ticker."""
+
+    def __init__(self, api_key, access_token):
+        from kiteconnect import KiteTicker
+        self.ticker = KiteTicker(api_key, access_token)
+        self._tokens = set()
+
+    def start(self, on_ticks):
+        def on_connect(ws, response):
+            # Resubscribe everything after a reconnect
+            if self._tokens:
+                ws.subscribe(list(self._tokens))
+                ws.set_mode(ws.MODE_FULL, list(self._tokens))
+
+        self.ticker.on_ticks = lambda ws, ticks: on_ticks(ticks)
+        self.ticker.on_connect = on_connect
+        self.ticker.connect(threaded=True)
+
+    def subscribe(self, tokens):
+        self._tokens.update(tokens)
+        if self.ticker.is_connected():
+            self.ticker.subscribe(list(tokens))
+            self.ticker.set_mode(self.ticker.MODE_FULL, list(tokens))
+
+    def stop(self):
+        self.ticker.close()
+
+
+class SimulatedTickFeed:
+    """Random-walk ticks in KiteTicker's format, for running without a broker."""
+
+    def __init__(self, start_prices=None, interval_seconds=0.5, volatility=0.001, seed=None):
+        self.prices = dict(start_prices or {})
+        self.interval_seconds = interval_seconds
+        self.volatility = volatility
+        self._random = random.Random(seed)
+        self._stop = threading.Event()
+        self._thread = None
+        self._on_ticks = None
+
+    def _tick(self, token):
+        price = self.prices.setdefault(token, 100.0)
+        price = round(max(0.05, price * (1 + self._random.gauss(0, self.volatility))), 2)
+        self.prices[token] = price
+        spread = max(0.05, round(price * 0.0005, 2))
+        return {
+            "instrument_token": token,
+            "last_price": price,
+            "exchange_timestamp": time.time(),
+            "depth": {
+                "buy": [{"price": round(price - spread * (i + 1), 2), "quantity": 100 * (i + 1), "orders": i + 1} for i in range(5)],
+                "sell": [{"price": round(price + spread * (i + 1), 2), "quantity": 100 * (i + 1), "orders": i + 1} for i in range(5)],
+            },
+        }
+
+    def emit(self):
+        """Push one tick for every subscribed token; called by the feed thread or directly in tests."""
+        if self._on_ticks:
+            self._on_ticks([self._tick(token) for token in list(self.prices)])
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.emit()
+
+    def start(self, on_ticks):
+        self._on_ticks = on_ticks
+        if self.interval_seconds:
+            self._thread = threading.Thread(target=self._run, name="simulated-ticks", daemon=True)
+            self._thread.start()
+
+    def subscribe(self, tokens):
+        for token in tokens:
+            self.prices.setdefault(token, 100.0)
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,133 @@
+import ast
+import datetime
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+# Cold-start import cost of the dashboard. Runs the import block at the top of
+# app.py in a fresh interpreter under `python -X importtime`, attributes the
+# time to top-level packages, and flags any heavy dependency that is loaded
+# before the first paint. Write the report next to each release and compare
+# against the previous one with --baseline.
+#
+#   python startup_report.py --output startup_report.json
+#   python startup_report.py --baseline startup_report.json --max-regression 20
+
+# Dependencies that must only be imported where they are used
+HEAVY_MODULES = ("prophet", "plotly", "yfinance", "kiteconnect", "cmdstanpy", "matplotlib")
+# Anything these pull in themselves (streamlit imports plotly) is not ours to defer
+FRAMEWORK_MODULES = ("streamlit",)
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def startup_imports(path="app.py"):
+    """Source of the import statements at the top of `path`, up to the first other statement."""
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    statements = []
+    for node in tree.body:
+        if not isinstance(node, (ast.Import, ast.ImportFrom)):
+            break
+        statements.append(ast.unparse(node))
+    return statements
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us, depth)] from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def _run(source, cwd):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", source],
+                            cwd=cwd, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+    return wall_ms, parse_importtime(result.stderr)
+
+
+def measure(statements, cwd=".", runs=3):
+    """Best-of-`runs` import profile of `statements`, net of bare interpreter startup."""
+    best = None
+    for _ in range(runs):
+        bare_wall_ms, bare_rows = _run("pass", cwd)
+        wall_ms, rows = _run("\n".join(statements), cwd)
+        if best is None or wall_ms - bare_wall_ms < best[0]:
+            best = (wall_ms - bare_wall_ms, rows, {row[0] for row in bare_rows})
+
+    wall_ms, rows, interpreter_modules = best
+    _, framework_rows = _run("\n".join(f"import {name}" for name in FRAMEWORK_MODULES), cwd)
+    framework_loaded = {row[0].split(".")[0] for row in framework_rows}
+    packages = {}
+    for module, _, cumulative_us, depth in rows:
+        # Top-level entries carry their whole subtree in `cumulative`
+        if depth == 0 and module not in interpreter_modules:
+            root = module.split(".")[0]
+            packages[root] = packages.get(root, 0) + cumulative_us / 1000
+    loaded = {row[0].split(".")[0] for row in rows}
+    return {
+        "measured_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "statements": statements,
+        "wall_ms": round(wall_ms, 1),
+        "import_ms": round(sum(packages.values()), 1),
+        "packages": {name: round(ms, 1) for name, ms in sorted(packages.items(), key=lambda item: -item[1])},
+        "heavy_modules_loaded": sorted(loaded.intersection(HEAVY_MODULES) - framework_loaded),
+    }
+
+
+def compare(report, baseline):
+    """Per-package change in ms against an earlier report, largest increase first."""
+    names = set(report["packages"]) | set(baseline["packages"])
+    deltas = {name: round(report["packages"].get(name, 0) - baseline["packages"].get(name, 0), 1) for name in names}
+    return dict(sorted(deltas.items(), key=lambda item: -item[1]))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import-time report for the dashboard's cold start")
+    parser.add_argument("--app", default="app.py")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="fail if import time grew by more than this many percent over the baseline")
+    args = parser.parse_args()
+
+    report = measure(startup_imports(args.app), cwd=os.path.dirname(os.path.abspath(args.app)), runs=args.runs)
+    print(f"Startup imports: {report['import_ms']:.0f} ms ({report['wall_ms']:.0f} ms wall, best of {args.runs})")
+    for name, ms in list(report["packages"].items())[:args.top]:
+        print(f"  {ms:9.1f} ms  {name}")
+    if report["heavy_modules_loaded"]:
+        print(f"Heavy modules loaded at startup: {', '.join(report['heavy_modules_loaded'])}")
+
+    status = 0
+    if report["heavy_modules_loaded"]:
+        status = 1
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        change = (report["import_ms"] / baseline["import_ms"] - 1) * 100 if baseline["import_ms"] else 0.0
+        print(f"Against {args.baseline}: {report['import_ms'] - baseline['import_ms']:+.0f} ms ({change:+.1f}%)")
+        for name, delta in list(compare(report, baseline).items())[:args.top]:
+            if abs(delta) >= 1:
+                print(f"  {delta:+9.1f} ms  {name}")
+        if args.max_regression is not None and change > args.max_regression:
+            status = 1
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(status)
@@ -0,0 +1,67 @@
+from basket import BasketExecutor, validate_basket
+from broker import PortfolioCache, RateLimitedKite
+from instruments import InstrumentIndex
+from mock_broker import MockKiteConnect
+
+
+def make_kite(**kwargs):
+    raw = MockKiteConnect(api_key="test", fill_delay_seconds=0, **kwargs)
+    return raw, RateLimitedKite(raw)
+
+
+def order(tradingsymbol, transaction_type="BUY", quantity=1):
+    return {"exchange": "NSE", "tradingsymbol": tradingsymbol, "transaction_type": transaction_type,
+            "quantity": quantity}
+
+
+def test_validate_basket_reports_each_bad_order():
+    raw, kite = make_kite()
+    index = InstrumentIndex(raw.instruments())
+    portfolio = PortfolioCache(kite)
+    orders = [
+        order("RELIANCE"),
+        order("INFY", "SELL", 6),
+        order("INFY", "SELL", 6),  # shares the 10 INFY held with the leg above
+        order("NOSUCH"),
+        order("TCS", quantity=0),
+    ]
+    assert validate_basket(orders, index, portfolio) == [
+        None,
+        None,
+        "Selling 12 but only 10 held",
+        "Unknown instrument NOSUCH on NSE",
+        "Quantity must be positive",
+    ]
+
+
+def test_run_tracks_every_order_to_a_final_status():
+    raw, kite = make_kite(reject_symbols={"SBIN"})
+    portfolio = PortfolioCache(kite)
+    assert portfolio.holding("NSE", "RELIANCE") is None
+    updates = []
+
+    status = BasketExecutor(kite, portfolio, poll_interval_seconds=0.01, timeout_seconds=5).run(
+        [order("RELIANCE", quantity=2), order("SBIN"), order("ITC", "SELL", 50)], on_update=updates.append)
+
+    by_symbol = {row["tradingsymbol"]: row for row in status}
+    assert by_symbol["RELIANCE"]["status"] == "COMPLETE"
+    assert by_symbol["RELIANCE"]["filled_quantity"] == 2
+    assert by_symbol["RELIANCE"]["average_price"] == 2900.0
+    assert by_symbol["SBIN"]["status"] == "REJECTED"
+    assert by_symbol["ITC"]["status"] == "COMPLETE"
+    assert updates and updates[-1] == status
+    # The executor drops the cached holdings once the basket is done
+    assert portfolio.holding("NSE", "RELIANCE")["quantity"] == 2
+    assert portfolio.holding("NSE", "ITC") is None
+
+
+def test_failed_placement_is_reported_not_raised():
+    raw, kite = make_kite()
+
+    def broken(**params):
+        raise RuntimeError("Order limit exceeded")
+    raw.place_order = broken
+
+    status = BasketExecutor(kite, poll_interval_seconds=0.01).run([order("TCS")])
+    assert status[0]["status"] == "FAILED"
+    assert status[0]["message"] == "Order limit exceeded"
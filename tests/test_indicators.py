@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.fake_market import synthetic_panel
+from indicators import IndicatorEngine
+
+
+@pytest.fixture(scope="module")
+def panel():
+    return synthetic_panel(["AAA.NS", "BBB.NS", "^NSEI"], "2023-01-01", "2024-06-01")
+
+
+def assert_same_results(engine, expected):
+    assert engine.index.equals(expected.index)
+    for name in expected._results:
+        pd.testing.assert_frame_equal(engine.indicator(name), expected.indicator(name), check_freq=False)
+
+
+def full(frame):
+    engine = IndicatorEngine()
+    engine.sync(frame)
+    return engine
+
+
+def test_incremental_sync_matches_full_computation(panel):
+    engine = IndicatorEngine()
+    for end in (200, 250, 251, len(panel)):
+        engine.sync(panel.iloc[:end])
+    assert_same_results(engine, full(panel))
+
+
+def test_still_forming_last_bar_is_recomputed(panel):
+    engine = full(panel)
+    revised = panel.copy()
+    revised.iloc[-1, revised.columns.get_loc(("AAA.NS", "Close"))] *= 1.02
+    engine.sync(revised)
+    assert_same_results(engine, full(revised))
+
+
+def test_shrinking_window_rebuilds(panel):
+    engine = full(panel)
+    shorter = panel.iloc[:150]
+    engine.sync(shorter)
+    assert engine.latest("EMA20").name == shorter.index[-1]
+    assert_same_results(engine, full(shorter))
+
+    engine.sync(panel)
+    assert_same_results(engine, full(panel))
+
+
+def test_later_start_rebuilds(panel):
+    engine = full(panel)
+    engine.sync(panel.iloc[30:])
+    assert_same_results(engine, full(panel.iloc[30:]))
+
+
+def test_rolling_windows_skip_a_symbols_missing_days(panel):
+    gappy = panel.copy()
+    gappy.loc[gappy.index[100], ("AAA.NS", slice(None))] = np.nan
+    engine = full(gappy)
+    close = gappy["AAA.NS"]["Close"].dropna()
+    sma20 = engine.for_symbol("AAA.NS")["SMA20"]
+
+    # Only the missing day itself is blank; windows spanning it use the symbol's own previous bars
+    assert np.isnan(sma20.iloc[100])
+    pd.testing.assert_series_equal(sma20.dropna(), close.rolling(20).mean().dropna(), check_names=False)
+    bb_half_width = (engine.indicator("BB_UPPER")["AAA.NS"] - engine.indicator("BB_MID")["AAA.NS"]) / 2
+    np.testing.assert_allclose(bb_half_width.reindex(close.index).iloc[19:], close.rolling(20).std(ddof=0).iloc[19:])
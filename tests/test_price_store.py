@@ -0,0 +1,150 @@
+import datetime
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fake_market import FakeYFinance
+from price_store import PriceStore
+
+JAN, FEB, MAR, APR = (datetime.date(2024, m, 1) for m in (1, 2, 3, 4))
+DEC = datetime.date(2023, 12, 1)
+
+
+class RecordingFetch:
+    """FakeYFinance.download that records each call and can blank out symbols."""
+
+    def __init__(self, empty=()):
+        self.fake = FakeYFinance()
+        self.empty = set(empty)
+        self.calls = []
+
+    def __call__(self, tickers, start=None, end=None, **kwargs):
+        self.calls.append((tuple(tickers), start, end))
+        raw = self.fake.download(tickers, start=start, end=end, **kwargs)
+        for symbol in self.empty.intersection(tickers):
+            # yfinance's silent failure: the column is there, the values are not
+            raw.loc[:, symbol] = np.nan
+        return raw
+
+
+def make_store(tmp_path, fetch, **kwargs):
+    kwargs.setdefault("backoff_seconds", 0)
+    return PriceStore(str(tmp_path / "prices.db"), fetch=fetch, **kwargs)
+
+
+def test_missing_ranges_only_covers_what_is_not_on_disk(tmp_path):
+    store = make_store(tmp_path, RecordingFetch())
+    store.get(["AAA.NS"], JAN, MAR)
+    assert store.missing_ranges(["AAA.NS"], JAN, MAR) == {}
+    assert store.missing_ranges(["AAA.NS"], DEC, APR) == {(DEC, JAN): ["AAA.NS"], (MAR, APR): ["AAA.NS"]}
+
+
+def test_symbols_with_the_same_gap_share_one_download(tmp_path):
+    fetch = RecordingFetch()
+    store = make_store(tmp_path, fetch)
+    store.get(["AAA.NS", "BBB.NS"], FEB, MAR)
+    store.get(["CCC.NS"], JAN, MAR)
+    assert store.missing_ranges(["AAA.NS", "BBB.NS", "CCC.NS"], JAN, MAR) == {(JAN, FEB): ["AAA.NS", "BBB.NS"]}
+
+    fetch.calls.clear()
+    frame = store.get(["AAA.NS", "BBB.NS", "CCC.NS"], JAN, MAR)
+    assert fetch.calls == [(("AAA.NS", "BBB.NS"), JAN, FEB)]
+    assert list(frame.columns.get_level_values(0).unique()) == ["AAA.NS", "BBB.NS", "CCC.NS"]
+    assert frame.index.min() >= pd.Timestamp(JAN) and frame.index.max() < pd.Timestamp(MAR)
+    assert not frame[("AAA.NS", "Close")].isna().any()
+
+
+def test_weekend_only_gap_is_not_fetched(tmp_path):
+    store = make_store(tmp_path, RecordingFetch())
+    saturday, monday = datetime.date(2024, 1, 6), datetime.date(2024, 1, 8)
+    assert store.missing_ranges(["AAA.NS"], saturday, monday) == {}
+
+
+def test_empty_response_does_not_mark_the_window_fetched(tmp_path):
+    store = make_store(tmp_path, lambda *args, **kwargs: pd.DataFrame(), empty_ttl_seconds=0)
+    assert store.get(["AAA.NS"], JAN, MAR).empty
+    assert store.missing_ranges(["AAA.NS"], JAN, MAR) == {(JAN, MAR): ["AAA.NS"]}
+
+    store.fetch = RecordingFetch()
+    frame = store.get(["AAA.NS"], JAN, MAR)
+    assert len(frame) > 30
+    assert store.missing_ranges(["AAA.NS"], JAN, MAR) == {}
+
+
+def test_empty_response_is_only_remembered_for_empty_ttl(tmp_path):
+    store = make_store(tmp_path, lambda *args, **kwargs: pd.DataFrame(), empty_ttl_seconds=300)
+    store.get(["AAA.NS"], JAN, MAR)
+    now = datetime.datetime.now()
+    assert store.missing_ranges(["AAA.NS"], JAN, MAR, now=now) == {}
+    later = now + datetime.timedelta(seconds=301)
+    assert store.missing_ranges(["AAA.NS"], JAN, MAR, now=later) == {(JAN, MAR): ["AAA.NS"]}
+
+
+def test_known_symbol_missing_from_a_partial_batch_is_retried_and_reported(tmp_path):
+    fetch = RecordingFetch()
+    store = make_store(tmp_path, fetch, retries=2)
+    store.get(["AAA.NS", "BBB.NS"], JAN, FEB)
+    fetch.empty = {"BBB.NS"}
+    fetch.calls.clear()
+    [(chunk, frame, errors)] = list(store.get_chunked(["AAA.NS", "BBB.NS"], FEB, MAR))
+
+    assert errors == {"BBB.NS": "no data returned"}
+    assert not frame[("AAA.NS", "Close")].isna().any()
+    # First call for both, then only the empty symbol on each retry
+    assert [call[0] for call in fetch.calls] == [("AAA.NS", "BBB.NS"), ("BBB.NS",), ("BBB.NS",)]
+    after_ttl = datetime.datetime.now() + datetime.timedelta(hours=1)
+    assert store.missing_ranges(["AAA.NS", "BBB.NS"], FEB, MAR, now=after_ttl) == {(FEB, MAR): ["BBB.NS"]}
+
+
+def test_dead_ticker_is_recorded_once_without_backoff(tmp_path):
+    fetch = RecordingFetch(empty={"DEAD.NS"})
+    store = make_store(tmp_path, fetch, retries=3, backoff_seconds=10)
+    started = time.perf_counter()
+    [(chunk, frame, errors)] = list(store.get_chunked(["AAA.NS", "DEAD.NS"], JAN, MAR))
+
+    assert time.perf_counter() - started < 5
+    assert errors == {"DEAD.NS": "no data returned"}
+    assert len(fetch.calls) == 1
+    assert store.missing_ranges(["DEAD.NS"], JAN, MAR) == {}
+
+
+def test_empty_symbols_are_retried_after_an_exception(tmp_path):
+    fetch = RecordingFetch(empty={"BBB.NS"})
+    attempts = []
+
+    def flaky(tickers, **kwargs):
+        attempts.append(tuple(tickers))
+        if len(attempts) == 1:
+            raise ConnectionError("Too Many Requests")
+        if len(attempts) == 3:
+            fetch.empty.clear()
+        return fetch(tickers, **kwargs)
+    store = make_store(tmp_path, flaky, retries=3)
+    frame, failed = store._get_reporting(["AAA.NS", "BBB.NS"], JAN, MAR)
+
+    assert failed == {}
+    assert attempts == [("AAA.NS", "BBB.NS"), ("AAA.NS", "BBB.NS"), ("BBB.NS",)]
+    assert not frame[("BBB.NS", "Close")].isna().any()
+
+
+def test_exceptions_are_retried_then_reported_per_chunk(tmp_path):
+    def failing(*args, **kwargs):
+        raise ConnectionError("Too Many Requests")
+    store = make_store(tmp_path, failing, retries=1)
+    results = list(store.get_chunked(["AAA.NS", "BBB.NS", "CCC.NS"], JAN, MAR, chunk_size=2))
+    errors = {symbol: error for _, _, chunk_errors in results for symbol, error in chunk_errors.items()}
+    assert errors == dict.fromkeys(["AAA.NS", "BBB.NS", "CCC.NS"], "Too Many Requests")
+
+
+def test_abandoning_get_chunked_cancels_queued_chunks(tmp_path):
+    fetch = RecordingFetch()
+    fetch.fake.latency_seconds = 0.2
+    store = make_store(tmp_path, fetch)
+    symbols = [f"S{i:02d}.NS" for i in range(16)]
+    chunks = store.get_chunked(symbols, JAN, MAR, chunk_size=2, max_workers=2)
+    next(chunks)
+    chunks.close()
+    time.sleep(0.5)
+    # Only the chunks already running when the generator closed were fetched
+    assert len(fetch.calls) < 8
@@ -0,0 +1,81 @@
+import time
+
+from quotes import QuoteService, SimulatedTickFeed
+
+
+def make_service(**kwargs):
+    # interval_seconds=0 starts no feed thread; the test drives ticks with emit()
+    feed = SimulatedTickFeed(start_prices={738561: 2900.0}, interval_seconds=0, seed=7, **kwargs)
+    return feed, QuoteService(feed)
+
+
+def test_ticks_fill_the_quote_table():
+    feed, service = make_service()
+    service.subscribe([738561, 408065])
+    assert service.last_price(738561) is None
+
+    feed.emit()
+    quote = service.quote(738561)
+    assert quote["last_price"] == feed.prices[738561]
+    assert len(quote["depth"]["buy"]) == len(quote["depth"]["sell"]) == 5
+    assert quote["depth"]["buy"][0]["price"] < quote["last_price"] < quote["depth"]["sell"][0]["price"]
+    assert service.last_price(408065) == feed.prices[408065]
+
+
+def test_each_tick_replaces_the_last_one():
+    feed, service = make_service(volatility=0.05)
+    service.subscribe([738561])
+    seen = []
+    for _ in range(5):
+        feed.emit()
+        seen.append(service.last_price(738561))
+    assert len(set(seen)) > 1
+    assert seen[-1] == feed.prices[738561]
+
+
+def test_seed_only_fills_until_the_first_tick():
+    feed, service = make_service()
+    service.seed(738561, 2850.0)
+    assert service.last_price(738561) == 2850.0
+    service.subscribe([738561])
+    feed.emit()
+    assert service.last_price(738561) == feed.prices[738561]
+    service.seed(738561, 1.0)
+    assert service.last_price(738561) == feed.prices[738561]
+
+
+def test_stale_ticks_and_seeds_are_not_fresh():
+    feed, service = make_service()
+    service.subscribe([738561])
+    service.seed(408065, 1500.0)
+    assert service.quote(408065)["source"] == "seed"
+    assert not service.is_fresh(408065)
+
+    feed.emit()
+    assert service.quote(738561)["source"] == "tick"
+    assert service.is_fresh(738561)
+    later = time.time() + service.max_age_seconds + 1
+    assert service.age(738561, now=later) > service.max_age_seconds
+    assert not service.is_fresh(738561, now=later)
+    assert service.age(1) is None
+
+
+def test_seed_replaces_a_stale_tick():
+    feed, service = make_service()
+    service.subscribe([738561])
+    feed.emit()
+    with service._lock:
+        service._quotes[738561]["received_at"] -= service.max_age_seconds + 1
+    service.seed(738561, 2850.0)
+    quote = service.quote(738561)
+    assert (quote["last_price"], quote["source"]) == (2850.0, "seed")
+    assert service.age(738561) < 1
+
+
+def test_subscribing_twice_only_forwards_new_tokens():
+    forwarded = []
+    feed, service = make_service()
+    feed.subscribe = lambda tokens: forwarded.append(list(tokens))
+    service.subscribe([1, 2])
+    service.subscribe([2, 3])
+    assert forwarded == [[1, 2], [3]]
@@ -0,0 +1,58 @@
+from ticker_info import TickerInfoCache
+
+
+class CountingFetch:
+    """Ticker.info stand-in that counts calls and can be switched to fail."""
+
+    def __init__(self):
+        self.calls = []
+        self.fail = False
+
+    def __call__(self, symbol):
+        self.calls.append(symbol)
+        if self.fail:
+            raise ConnectionError("Too Many Requests")
+        return {"longName": symbol.title(), "trailingPE": 21.5, "unused": 1}
+
+
+def make_cache(tmp_path, fetch, **kwargs):
+    return TickerInfoCache(str(tmp_path / "info.json"), fetch=fetch, max_workers=2, **kwargs)
+
+
+def test_ttl_is_per_call(tmp_path):
+    fetch = CountingFetch()
+    cache = make_cache(tmp_path, fetch, ttl_seconds=3600)
+    assert cache.get("INFY.NS") == {"longName": "Infy.Ns", "trailingPE": 21.5}
+    assert cache.is_fresh("INFY.NS")
+    assert not cache.is_fresh("INFY.NS", ttl_seconds=0)
+
+    cache.get("INFY.NS")
+    cache.get("INFY.NS", ttl_seconds=0)
+    assert fetch.calls == ["INFY.NS", "INFY.NS"]
+    assert cache.ttl_seconds == 3600
+
+
+def test_failures_are_not_retried_until_the_failure_ttl_passes(tmp_path):
+    fetch = CountingFetch()
+    cache = make_cache(tmp_path, fetch, failure_ttl_seconds=300)
+    cache.get("INFY.NS")
+    fetch.fail = True
+
+    # The stale entry is served after a failure, and for the failure TTL without a new request
+    assert cache.get("INFY.NS", ttl_seconds=0) == {"longName": "Infy.Ns", "trailingPE": 21.5}
+    assert cache.get("TCS.NS") == {}
+    cache.prefetch(["INFY.NS", "TCS.NS"], ttl_seconds=0)
+    assert cache.get("TCS.NS") == {}
+    assert fetch.calls == ["INFY.NS", "INFY.NS", "TCS.NS"]
+
+    fetch.fail = False
+    cache._failed = {symbol: failed_at - 301 for symbol, failed_at in cache._failed.items()}
+    assert cache.get("TCS.NS") == {"longName": "Tcs.Ns", "trailingPE": 21.5}
+    assert "TCS.NS" not in cache._failed
+
+
+def test_entries_survive_a_restart(tmp_path):
+    make_cache(tmp_path, CountingFetch()).get("INFY.NS")
+    fetch = CountingFetch()
+    assert make_cache(tmp_path, fetch).get("INFY.NS")["longName"] == "Infy.Ns"
+    assert fetch.calls == []
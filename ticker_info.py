@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+
+# Ticker.info is the slowest call on the deep-dive page, so only the fields the
+# dashboard shows are kept, with a TTL, persisted to a JSON file and prefetched
+# in the background for every selected symbol. A failed fetch is remembered
+# in memory for failure_ttl_seconds so reruns don't keep asking yfinance.
+
+DEFAULT_INFO_PATH = os.environ.get("TICKER_INFO_PATH", "ticker_info_cache.json")
+INFO_FIELDS = [
+    "longName", "shortName", "marketCap", "trailingPE", "beta",
+    "fiftyTwoWeekHigh", "fiftyTwoWeekLow", "forwardDividendRate", "dividendYield",
+]
+
+
+def _yf_info(symbol):
+    import yfinance as yf
+    return yf.Ticker(symbol).info
+
+
+class TickerInfoCache:
+    def __init__(self, path=DEFAULT_INFO_PATH, ttl_seconds=6 * 3600, fetch=None, max_workers=8,
+                 failure_ttl_seconds=5 * 60):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.failure_ttl_seconds = failure_ttl_seconds
+        self.fetch = fetch or _yf_info
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ticker-info")
+        self._pending = {}
+        self._failed = {}
+        self._entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        # Write-then-rename so a crash never leaves a half-written cache file
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+
+    def is_fresh(self, symbol, ttl_seconds=None):
+        """True if the entry for `symbol` is younger than `ttl_seconds` (default: self.ttl_seconds)."""
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        entry = self._entries.get(symbol)
+        return entry is not None and time.time() - entry["fetched_at"] < ttl_seconds
+
+    def _recently_failed(self, symbol):
+        return time.time() - self._failed.get(symbol, float("-inf")) < self.failure_ttl_seconds
+
+    def _refresh(self, symbol):
+        try:
+            info = self.fetch(symbol) or {}
+            entry = {"fetched_at": time.time(), "info": {k: info[k] for k in INFO_FIELDS if k in info}}
+            with self._lock:
+                self._entries[symbol] = entry
+                self._failed.pop(symbol, None)
+                self._save()
+            return entry["info"]
+        except Exception:
+            with self._lock:
+                self._failed[symbol] = time.time()
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(symbol, None)
+
+    def _submit(self, symbol):
+        # Caller holds the lock; reuse an in-flight request for the same symbol
+        if symbol not in self._pending:
+            self._pending[symbol] = self._pool.submit(self._refresh, symbol)
+        return self._pending[symbol]
+
+    def prefetch(self, symbols, ttl_seconds=None):
+        """Start background fetches for every symbol that is missing or stale and has not just failed."""
+        with self._lock:
+            for symbol in symbols:
+                if not self.is_fresh(symbol, ttl_seconds) and not self._recently_failed(symbol):
+                    self._submit(symbol)
+
+    def get(self, symbol, timeout=None, ttl_seconds=None):
+        """Cached info for `symbol`, fetching it if missing or stale.
+
+        Falls back to the stale entry (or {}) if the fetch fails, and for
+        failure_ttl_seconds after a failure without trying again.
+        """
+        with self._lock:
+            if self.is_fresh(symbol, ttl_seconds):
+                tracing.annotate(cache="hit")
+                return self._entries[symbol]["info"]
+            if self._recently_failed(symbol):
+                tracing.annotate(cache="failed")
+                entry = self._entries.get(symbol)
+                return entry["info"] if entry else {}
+            future = self._submit(symbol)
+        tracing.annotate(cache="miss")
+        try:
+            with tracing.span("yfinance.info"):
+                return future.result(timeout=timeout)
+        except Exception:
+            entry = self._entries.get(symbol)
+            return entry["info"] if entry else {}
@@ -0,0 +1,158 @@
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+
+# Lightweight spans for finding out where a dashboard run spends its time.
+# A trace lives on the thread running the script (Streamlit runs each session's
+# script on its own thread), so library code can open spans without being
+# handed anything. With no active trace span() returns a shared no-op, which
+# keeps the cost of the instrumentation negligible when profiling is off.
+# Finished traces are appended to a JSONL file, one line per span.
+
+DEFAULT_TRACE_PATH = os.environ.get("TRACE_PATH", "traces.jsonl")
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    def __init__(self, trace, name, attrs):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+        self.parent = None
+        self.depth = 0
+        self.started_at = None
+        self.duration_ms = None
+        self.error = None
+        self._started = None
+
+    def set(self, **attrs):
+        """Attach attributes such as rows=... or cache="hit" to the span."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = self.trace._stack
+        if stack:
+            self.parent = stack[-1].name
+            self.depth = len(stack)
+        stack.append(self)
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        if exc_type is not None and exc_type.__name__ not in ("StopException", "RerunException"):
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.trace._stack.remove(self)
+        self.trace.spans.append(self)
+        return False
+
+    def record(self):
+        return {
+            "run_id": self.trace.run_id, "trace": self.trace.name, "span": self.name,
+            "parent": self.parent, "depth": self.depth, "started_at": round(self.started_at, 6),
+            "duration_ms": round(self.duration_ms, 3), "error": self.error, **self.attrs,
+        }
+
+
+class Trace:
+    def __init__(self, name, path=DEFAULT_TRACE_PATH):
+        self.name = name
+        self.path = path
+        self.run_id = uuid.uuid4().hex[:12]
+        self.spans = []
+        self._stack = []
+
+    def span(self, name, **attrs):
+        return Span(self, name, attrs)
+
+    def records(self):
+        """Finished spans in start order."""
+        return [s.record() for s in sorted(self.spans, key=lambda s: s._started)]
+
+    def flush(self):
+        if not self.path or not self.spans:
+            return
+        lines = "".join(json.dumps(r, default=str) + "\n" for r in self.records())
+        with _write_lock, open(self.path, "a") as f:
+            f.write(lines)
+
+
+def current():
+    """The trace active on this thread, or None."""
+    return getattr(_local, "trace", None)
+
+
+def span(name, **attrs):
+    """Context manager timing a block under the active trace; a no-op without one."""
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        return _NULL_SPAN
+    return Span(trace, name, attrs)
+
+
+def annotate(**attrs):
+    """Set attributes on the innermost open span, e.g. annotate(cache="miss") inside a cached function."""
+    trace = getattr(_local, "trace", None)
+    if trace is not None and trace._stack:
+        trace._stack[-1].attrs.update(attrs)
+
+
+def begin(name, path=DEFAULT_TRACE_PATH):
+    """Start a trace on this thread, flushing any trace still open on it."""
+    finish()
+    _local.trace = Trace(name, path)
+    return _local.trace
+
+
+def finish():
+    """Close the active trace, append it to its file and return it."""
+    trace = getattr(_local, "trace", None)
+    _local.trace = None
+    if trace is not None:
+        trace.flush()
+    return trace
+
+
+def traced(name, enabled=lambda: False):
+    """Decorator running the function in span(name).
+
+    Inside an active trace the span nests as usual. Called on its own (a
+    Streamlit fragment rerun), the function gets a trace of its own when
+    enabled() is true.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if current() is not None:
+                with span(name):
+                    return func(*args, **kwargs)
+            if not enabled():
+                return func(*args, **kwargs)
+            begin(name)
+            try:
+                with span(name):
+                    return func(*args, **kwargs)
+            finally:
+                finish()
+        return wrapper
+    return decorator
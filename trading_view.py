@@ -0,0 +1,374 @@
+import os
+
+import pandas as pd
+import streamlit as st
+
+import tracing
+from basket import BasketExecutor, validate_basket
+from broker import ApiThrottle, BrokerSession, PortfolioCache, batch_ltp
+from instruments import InstrumentIndex, InstrumentStore
+from mock_broker import MockKiteConnect
+from performance import sell_rule_scan
+from quotes import KiteTickerFeed, QuoteService, SimulatedTickFeed
+from widgets import download_df_as_csv, profiling_enabled
+
+# Zerodha trading section of the dashboard. app.py imports it last, and
+# kiteconnect itself is only imported when a broker session or ticker is
+# created, so none of it is paid for before the analysis has painted.
+
+
+@st.cache_resource # Kite's rate limits are per API key, so every browser session using it shares one throttle
+def get_api_throttle(api_key):
+    return ApiThrottle()
+
+
+def get_broker_session(api_key, api_secret):
+    """This browser session's login, kept in st.session_state so the access token is never shared."""
+    session = st.session_state.get("broker_session")
+    if session is None or not session.matches(api_key, api_secret):
+        if session is not None:
+            session.logout()
+        kite_factory = MockKiteConnect if os.environ.get("KITE_MOCK") else None
+        session = st.session_state["broker_session"] = BrokerSession(
+            api_key, kite_factory=kite_factory, throttle=get_api_throttle(api_key))
+    return session
+
+
+# --- Helper Function to get Instrument Token ---
+@st.cache_resource # Indexed instrument dumps, persisted to disk and refreshed once a day
+def get_instrument_store():
+    return InstrumentStore()
+
+
+def get_instruments(kite, exchange="NSE"):
+    try:
+        return get_instrument_store().index(kite, exchange)
+    except Exception as e:
+        st.error(f"Error fetching instruments for {exchange}: {e}")
+        return InstrumentIndex([])
+
+
+@st.cache_resource # One WebSocket ticker per access token, shared across reruns
+def get_quote_service(api_key, access_token):
+    if os.environ.get("QUOTE_FEED") == "simulated":
+        return QuoteService(SimulatedTickFeed())
+    return QuoteService(KiteTickerFeed(api_key, access_token))
+
+
+@st.cache_resource # Holdings/positions with a short TTL, dropped after every order we place
+def get_portfolio_cache(access_token, _kite):
+    return PortfolioCache(_kite, ttl_seconds=30)
+
+
+# Order inputs and buttons rerun only the trading section, not the analysis above
+@st.fragment
+@tracing.traced("Trading", profiling_enabled)
+def trading_section(kite, portfolio, api_key, exchange, instrument_index, sell_rule_pct, stop_loss_pct):
+    sell_rule_factor = 1 + sell_rule_pct / 100
+
+    st.header("Account Information")
+
+    # 3. Show the balance
+    if st.button("Show Balance"):
+        try:
+            margins = kite.margins()
+            equity_margin = margins.get('equity', {})
+            available_cash = equity_margin.get('available', {}).get('live_margin', 'N/A')
+            st.write(f"**Available Equity Margin:** ₹{available_cash}")
+        except Exception as e:
+            st.error(f"Error fetching balance: {e}")
+
+    st.header("Trade Execution")
+
+    # 2. Get the stock symbol as input
+    tradingsymbol = st.text_input("Enter Stock Symbol (e.g., RELIANCE, TCS)").upper()
+
+    # Find instrument token for the given symbol and exchange
+    instrument_token = None
+    if tradingsymbol and len(instrument_index):
+        instrument_token = instrument_index.token(exchange, tradingsymbol)
+        if instrument_token is None:
+            st.warning(f"Could not find instrument token for {tradingsymbol} on {exchange}. Check the symbol and exchange.")
+            suggestions = instrument_index.search(exchange, tradingsymbol)
+            if suggestions:
+                st.caption(f"Did you mean: {', '.join(suggestions)}")
+
+    # Placeholder for quantity input
+    quantity = st.number_input("Enter Quantity", min_value=1, value=1, step=1)
+
+    # 3. Based on the sell rule (default 5% diff) show buy or sell
+    st.header(f"Trading Suggestion ({sell_rule_pct:g}% Difference Rule)")
+
+    if tradingsymbol and instrument_token:
+        try:
+            # Get current LTP from the streaming quote table
+            quote_service = get_quote_service(api_key, kite.access_token)
+            quote_service.subscribe([instrument_token])
+            if not quote_service.is_fresh(instrument_token):
+                # No tick yet, or the stream has gone quiet: one REST call for a current price
+                try:
+                    ltp_data = kite.ltp([f"{exchange}:{tradingsymbol}"])
+                    if f"{exchange}:{tradingsymbol}" in ltp_data:
+                        quote_service.seed(instrument_token, ltp_data[f"{exchange}:{tradingsymbol}"]['last_price'])
+                except Exception as e:
+                    if quote_service.quote(instrument_token) is None:
+                        raise
+                    st.warning(f"Could not refresh LTP for {tradingsymbol}, showing the last known price: {e}")
+            quote = quote_service.quote(instrument_token)
+            current_ltp = quote["last_price"] if quote else None
+            if current_ltp is not None:
+                st.write(f"Current Last Traded Price (LTP) for {tradingsymbol}: ₹{current_ltp}")
+                source = "live tick" if quote["source"] == "tick" else "REST snapshot"
+                st.caption(f"Quote is {quote_service.age(instrument_token):.1f}s old ({source})")
+                depth = quote.get("depth")
+                if depth and depth.get("buy") and depth.get("sell"):
+                    st.caption(f"Best bid ₹{depth['buy'][0]['price']} × {depth['buy'][0]['quantity']} | "
+                               f"Best ask ₹{depth['sell'][0]['price']} × {depth['sell'][0]['quantity']}")
+            else:
+                 st.warning(f"Could not fetch LTP for {tradingsymbol} on {exchange}. Cannot apply {sell_rule_pct:g}% rule.")
+
+
+            # Look up holdings to check average price if selling
+            with tracing.span("Portfolio holdings"):
+                stock_holding = portfolio.holding(exchange, tradingsymbol)
+
+            suggestion = "Analyze..."
+            action = None
+            avg_buy_price = None
+            held_quantity = 0
+
+            if stock_holding:
+                avg_buy_price = stock_holding['average_price']
+                held_quantity = stock_holding['quantity']
+                st.write(f"Your Average Buy Price for {tradingsymbol}: ₹{avg_buy_price:.2f}")
+                st.write(f"Quantity Held: {held_quantity}")
+
+                # Sell Rule: If LTP is sell_rule_pct% or more above the average buy price
+                if current_ltp is not None and current_ltp >= avg_buy_price * sell_rule_factor:
+                    suggestion = f"**SELL:** LTP (₹{current_ltp}) is >= {sell_rule_pct:g}% above Average Buy Price (₹{avg_buy_price * sell_rule_factor:.2f})."
+                    action = "SELL"
+                elif current_ltp is not None:
+                    suggestion = f"**HOLD/Analyze:** LTP (₹{current_ltp}) is not {sell_rule_pct:g}% or more above Average Buy Price (₹{avg_buy_price:.2f})."
+                else:
+                     suggestion = f"Cannot apply {sell_rule_pct:g}% sell rule: Could not fetch LTP."
+
+            else:
+                # Simple Placeholder for Buy Logic (Needs a real strategy)
+                suggestion = f"No holdings found for {tradingsymbol}. Consider a BUY based on your strategy."
+                # Decide if we show a buy button based on *some* condition or just allow manual buy via button below
+                # For simplicity, let's just show the buy button regardless if the instrument is found
+
+            st.markdown(suggestion)
+
+            # 4. Using zerodha api buy or sell the stock
+            buy_col, sell_col = st.columns(2)
+
+            with buy_col:
+                 # Disable buy button if no symbol/quantity or LTP not available
+                 if st.button(f"Execute BUY Order for {tradingsymbol}", disabled=not tradingsymbol or quantity <= 0 or current_ltp is None):
+                     try:
+                         st.info(f"Placing BUY order for {quantity} shares of {tradingsymbol}...")
+                         order_id = portfolio.place_order(
+                             tradingsymbol=tradingsymbol,
+                             exchange=exchange,
+                             transaction_type=kite.TRANSACTION_TYPE_BUY,
+                             quantity=quantity,
+                             variety=kite.VARIETY_REGULAR, # or kite.VARIETY_MIS, etc.
+                             order_type=kite.ORDER_TYPE_MARKET, # or kite.ORDER_TYPE_LIMIT, etc.
+                             product=kite.PRODUCT_CNC # or kite.PRODUCT_MIS, etc.
+                         )
+                         st.success(f"BUY order placed successfully! Order ID: {order_id}")
+                         st.info("Check your Zerodha Kite terminal for order status.")
+                     except Exception as e:
+                         st.error(f"Error placing BUY order: {e}")
+
+            with sell_col:
+                 # Disable sell button if no symbol/quantity, no holdings, LTP not available, or sell rule not met
+                 if st.button(f"Execute SELL Order for {tradingsymbol}", disabled=action != "SELL" or quantity <= 0 or held_quantity <= 0 or current_ltp is None):
+                      if quantity > held_quantity:
+                          st.warning(f"Attempting to sell {quantity} but only {held_quantity} held. Adjusting quantity to {held_quantity}.")
+                          sell_quantity = held_quantity
+                      else:
+                          sell_quantity = quantity
+
+                      if sell_quantity > 0:
+                          try:
+                              st.info(f"Placing SELL order for {sell_quantity} shares of {tradingsymbol}...")
+                              # Place SELL order
+                              order_id = portfolio.place_order(
+                                  tradingsymbol=tradingsymbol,
+                                  exchange=exchange,
+                                  transaction_type=kite.TRANSACTION_TYPE_SELL,
+                                  quantity=sell_quantity,
+                                  variety=kite.VARIETY_REGULAR, # or kite.VARIETY_MIS, etc.
+                                  order_type=kite.ORDER_TYPE_MARKET, # or kite.ORDER_TYPE_LIMIT, etc.
+                                  product=kite.PRODUCT_CNC # or kite.PRODUCT_MIS, etc.
+                              )
+                              st.success(f"SELL order placed successfully! Order ID: {order_id}")
+                              st.info("Check your Zerodha Kite terminal for order status.")
+                          except Exception as e:
+                              st.error(f"Error placing SELL order: {e}")
+                      else:
+                           st.warning("Cannot place SELL order: Quantity to sell is zero.")
+
+
+        except Exception as e:
+            st.error(f"An error occurred during analysis: {e}")
+
+    # --- Portfolio Sell Rule Scan ---
+    st.header("Portfolio Sell Rule Scan")
+    if st.button("Scan All Holdings"):
+        try:
+            # One holdings call and one batched quote call for the whole portfolio
+            with tracing.span("Portfolio holdings"):
+                scan_holdings = portfolio.holdings()
+            scan_prices = batch_ltp(kite, [f"{h['exchange']}:{h['tradingsymbol']}" for h in scan_holdings])
+            scan_df = sell_rule_scan(scan_holdings, scan_prices, sell_rule_pct, stop_loss_pct)
+            if scan_df.empty:
+                st.info("No holdings found in your portfolio.")
+            else:
+                action_counts = scan_df["Action"].value_counts()
+                st.write(f"**{action_counts.get('SELL', 0)}** to sell, **{action_counts.get('STOP-LOSS', 0)}** at stop-loss, "
+                         f"**{action_counts.get('HOLD', 0)}** to hold out of {len(scan_df)} holdings.")
+                st.dataframe(scan_df, use_container_width=True)
+                download_df_as_csv(scan_df, "sell_rule_scan.csv", label_prefix="📥 Download Scan")
+        except Exception as e:
+            st.error(f"Error scanning holdings: {e}")
+
+    # --- Basket Orders ---
+    st.header("Basket Orders")
+    st.caption(f"Orders are validated against the {exchange} instrument list and your holdings, then placed concurrently.")
+    basket_input = st.data_editor(
+        pd.DataFrame({"tradingsymbol": pd.Series(dtype="str"), "transaction_type": pd.Series(dtype="str"),
+                      "quantity": pd.Series(dtype="int")}),
+        num_rows="dynamic",
+        column_config={
+            "transaction_type": st.column_config.SelectboxColumn("transaction_type", options=["BUY", "SELL"], required=True),
+            "quantity": st.column_config.NumberColumn("quantity", min_value=1, step=1, required=True),
+        },
+        key="basket_orders",
+    )
+    basket_orders = [
+        {"exchange": exchange, "tradingsymbol": str(row["tradingsymbol"]).strip().upper(),
+         "transaction_type": row["transaction_type"], "quantity": int(row["quantity"])}
+        for row in basket_input.dropna().to_dict("records")
+    ]
+    if st.button("Execute Basket", disabled=not basket_orders):
+        basket_errors = validate_basket(basket_orders, instrument_index, portfolio)
+        if any(basket_errors):
+            st.error("Basket not placed; fix these orders first:")
+            st.dataframe(pd.DataFrame([dict(o, error=e) for o, e in zip(basket_orders, basket_errors) if e]), use_container_width=True)
+        else:
+            fill_table = st.empty()
+            basket_status = BasketExecutor(kite, portfolio).run(
+                basket_orders, on_update=lambda rows: fill_table.dataframe(pd.DataFrame(rows), use_container_width=True)
+            )
+            fill_table.dataframe(pd.DataFrame(basket_status), use_container_width=True)
+
+    st.markdown("---")
+    st.info("Disclaimer: This is a simplified example for educational purposes. "
+            "Trading involves risk. Use this code responsibly and at your own risk. "
+            "Implement proper error handling, security measures (especially for credentials), "
+            " and a robust trading strategy for any real trading.")
+
+    # --- Optional: Display Holdings ---
+    st.header("Your Holdings")
+    if st.button("Show Holdings"):
+        try:
+            with tracing.span("Portfolio holdings"):
+                holdings_data = portfolio.holdings()
+            if holdings_data:
+                holdings_df = pd.DataFrame(holdings_data)
+                st.dataframe(holdings_df)
+            else:
+                st.info("No holdings found in your portfolio.")
+        except Exception as e:
+            st.error(f"Error fetching holdings: {e}")
+
+
+# --- Streamlit UI ---
+@tracing.traced("Broker login", profiling_enabled)
+def render():
+    st.title("Simple Zerodha Trading Bot (Manual Token Generation)")
+
+    st.sidebar.header("API Credentials")
+    api_key = st.sidebar.text_input("Enter Zerodha API Key")
+    api_secret = st.sidebar.text_input("Enter Zerodha API Secret", type="password")
+
+    # --- WARNING ---
+    st.warning("SECURITY WARNING: Handling API Secret and Access Token directly is highly insecure. "
+               "Use this ONLY for local testing. For production, implement Zerodha's OAuth login flow securely.")
+    # --- End WARNING ---
+
+    kite = None # Initialize kite as None
+    access_token = None # Initialize access_token
+
+    # --- Manual Token Generation Flow ---
+    st.header("Generate Access Token")
+    st.info("Follow these steps to generate your Access Token:")
+
+    if api_key and api_secret:
+        try:
+            # Step 1: Generate Login URL
+            broker_session = get_broker_session(api_key, api_secret)
+            # You need to configure this redirect_uri in your Zerodha Developer Console
+            # For local testing, you can use http://localhost:8501/ (the default Streamlit address)
+            # or a specific path like http://localhost:8501/callback if your web server handles routing.
+            # In a real app, this must be a URL your server handles.
+            redirect_uri = "http://localhost:8501/" # Replace with your configured redirect URI
+
+            login_url = broker_session.login_url() # pykiteconnect automatically adds redirect_uri if configured
+            st.write(f"1. Click the link below to log in to Zerodha and authorize your app:")
+            st.markdown(f"**[Login to Zerodha]({login_url})**")
+            st.write(f"   (Your configured redirect URI: `{broker_session.raw._redirect_url}`)") # Display configured redirect URI
+
+            st.write("2. After logging in, you will be redirected to your redirect URI. The URL in your browser will look like: `YOUR_REDIRECT_URI?request_token=YOUR_REQUEST_TOKEN&status=success`")
+            st.write("3. Copy the value of `request_token` from the redirected URL.")
+
+            request_token = st.text_input("4. Paste the Request Token here:")
+
+            if request_token:
+                if st.button("Generate Access Token from Request Token"):
+                    try:
+                        # Step 5 & 6: Exchange request_token for access_token; the session verifies it with profile()
+                        data = broker_session.generate_session(request_token, api_secret=api_secret)
+                        access_token = data["access_token"]
+
+                        st.success("Access Token generated successfully!")
+                        st.write(f"Your Access Token (Keep this secure!): `{access_token}`")
+
+                    except Exception as e:
+                        st.error(f"Error generating Access Token: {e}")
+                        st.info("Ensure your API Key, Secret, and Request Token are correct and the token hasn't expired.")
+            elif not broker_session.is_authenticated:
+                st.info("Paste the Request Token to generate the Access Token.")
+
+            # The session outlives this rerun, so trading stays available until the token is dropped
+            if broker_session.is_authenticated:
+                kite = broker_session.client
+                st.sidebar.success("Kite Connect session active.")
+                st.sidebar.write(f"Logged in as: {broker_session.user_name}")
+                if st.sidebar.button("Log out of Kite"):
+                    broker_session.logout()
+                    st.rerun()
+
+        except Exception as e:
+            st.error(f"Error generating login URL: {e}")
+            st.info("Please check your API Key.")
+
+    # --- Check if kite object is initialized for trading sections ---
+    if kite:
+        st.header("Trading Functionality")
+
+        portfolio = get_portfolio_cache(kite.access_token, kite)
+
+        st.sidebar.header("Trade Settings")
+        exchange = st.sidebar.selectbox("Select Exchange", ["NSE", "BSE", "NFO", "MCX"], index=0)
+        sell_rule_pct = st.sidebar.number_input("Sell when LTP is above avg price by (%)", min_value=0.0, value=5.0, step=0.5, format="%.1f")
+        stop_loss_pct = st.sidebar.number_input("Stop-loss when below avg price by (%) (0 = off)", min_value=0.0, value=0.0, step=0.5, format="%.1f")
+        instrument_index = get_instruments(kite, exchange)
+
+        trading_section(kite, portfolio, api_key, exchange, instrument_index, sell_rule_pct, stop_loss_pct)
+
+    else:
+        st.info("Please provide your API Key and Secret in the sidebar and generate an Access token")
@@ -0,0 +1,17 @@
+import streamlit as st
+
+
+def profiling_enabled():
+    """Whether the sidebar "Profile this run" toggle is on for this session."""
+    return st.session_state.get("profile_enabled", False)
+
+
+# Helper function to download DataFrame as CSV
+def download_df_as_csv(df, filename="data.csv", label_prefix="📥 Download"):
+    csv = df.to_csv(index=False).encode('utf-8')
+    st.download_button(
+        label=f"{label_prefix} {filename}",
+        data=csv,
+        file_name=filename,
+        mime='text/csv',
+    )
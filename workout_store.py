@@ -0,0 +1,282 @@
+import hashlib
+import sqlite3
+import threading
+from collections import Counter
+
+import pandas as pd
+
+# SQLite storage for the pull-up progress tracker (exercise.py). One
+# connection is opened per process and shared by every Streamlit session;
+# WAL lets readers carry on while a write commits, and batched inserts go
+# through executemany in a single transaction.
+# Reads are incremental: the loaded frame is kept, and after a change only
+# rows with a higher id are fetched. Changes are noticed through SQLite's
+# data_version (commits from other connections) plus a counter of our own
+# writes, so an unchanged table costs two tiny queries per rerun.
+# daily_summary holds one row per (entry_date, exercise) with the max and
+# total of each charted metric. Triggers keep it current: an insert folds the
+# new row in, a delete recomputes just the affected day from workouts (a max
+# cannot be un-applied). The progress charts read it instead of the raw log.
+# Every row carries a short content hash (row_hash) so a CSV import can tell
+# which of its rows are already logged. Identical workouts are legitimate
+# (three equal sets in one session), so duplicates are counted: the n-th copy
+# of a row in the file is skipped only if the table already held n of them.
+
+DB_PATH = "progress.db"
+COLUMNS = ["entry_date", "workout_type", "exercise", "sets", "reps", "assistance_level",
+           "dead_hang_seconds", "negative_seconds", "notes"]
+
+SUMMARY_METRICS = ("dead_hang_seconds", "negative_seconds", "reps")
+TEXT_COLUMNS = ("workout_type", "exercise", "assistance_level", "notes")
+INT_COLUMNS = ("sets", "reps")
+REAL_COLUMNS = ("dead_hang_seconds", "negative_seconds")
+IMPORT_CHUNK_ROWS = 10_000
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    # With WAL, NORMAL only syncs at checkpoints and still never corrupts the database
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    "cache_size": -16000,  # KiB
+    "mmap_size": 64 * 1024 * 1024,
+}
+
+
+def row_hash(values):
+    """Content hash of a row in COLUMNS order, typed as SQLite returns it (str, int, float)."""
+    return hashlib.blake2b(repr(tuple(values)).encode(), digest_size=8).hexdigest()
+
+
+def clean_chunk(chunk):
+    """Typed rows (tuples in COLUMNS order) from a chunk of CSV text, plus [(line, problem)] for rejected rows.
+
+    Missing columns take the sidebar form's defaults; entry_date is required.
+    """
+    chunk = chunk.reindex(columns=COLUMNS)
+    problems = pd.Series("", index=chunk.index)
+    dates = pd.to_datetime(chunk["entry_date"], errors="coerce")
+    problems[dates.isna()] += "entry_date "
+    cleaned = pd.DataFrame({"entry_date": dates.dt.strftime("%Y-%m-%d")}, index=chunk.index)
+    for column in INT_COLUMNS + REAL_COLUMNS:
+        raw = chunk[column]
+        numbers = pd.to_numeric(raw, errors="coerce")
+        bad = (numbers.isna() & raw.notna()) | (numbers < 0)
+        if column in INT_COLUMNS:
+            bad |= numbers.notna() & (numbers % 1 != 0)
+        problems[bad] += f"{column} "
+        numbers = numbers.where(~bad).fillna(0)
+        cleaned[column] = numbers.astype(int) if column in INT_COLUMNS else numbers.astype(float)
+    for column in TEXT_COLUMNS:
+        cleaned[column] = chunk[column].fillna("").astype(str)
+    ok = problems == ""
+    # object arrays hold plain Python scalars, which sqlite3 binds and row_hash sees like stored values
+    rows = list(map(tuple, cleaned.loc[ok, COLUMNS].to_numpy(dtype=object).tolist()))
+    # Line numbers count the header as line 1
+    rejected = [(line + 2, f"invalid {text.strip().replace(' ', ', ')}") for line, text in problems[~ok].items()]
+    return rows, rejected
+
+
+def _summary_sql():
+    columns = ", ".join(f"max_{m}, total_{m}" for m in SUMMARY_METRICS)
+    table = f"""CREATE TABLE IF NOT EXISTS daily_summary (
+                    entry_date TEXT NOT NULL,
+                    exercise TEXT NOT NULL,
+                    entries INTEGER NOT NULL,
+                    {", ".join(f"max_{m} REAL, total_{m} REAL NOT NULL" for m in SUMMARY_METRICS)},
+                    PRIMARY KEY (entry_date, exercise)
+                ) WITHOUT ROWID"""
+    # NULL never beats a value, and two NULLs stay NULL, matching pandas' max()
+    merge = ", ".join(f"max_{m} = MAX(COALESCE(max_{m}, excluded.max_{m}), COALESCE(excluded.max_{m}, max_{m})), "
+                      f"total_{m} = total_{m} + excluded.total_{m}" for m in SUMMARY_METRICS)
+    on_insert = f"""CREATE TRIGGER IF NOT EXISTS workouts_summary_insert AFTER INSERT ON workouts BEGIN
+                        INSERT INTO daily_summary (entry_date, exercise, entries, {columns})
+                        VALUES (COALESCE(NEW.entry_date, ''), COALESCE(NEW.exercise, ''), 1,
+                                {", ".join(f"NEW.{m}, COALESCE(NEW.{m}, 0)" for m in SUMMARY_METRICS)})
+                        ON CONFLICT (entry_date, exercise) DO UPDATE SET entries = entries + 1, {merge};
+                    END"""
+    regroup = f"""INSERT INTO daily_summary (entry_date, exercise, entries, {columns})
+                  SELECT COALESCE(entry_date, ''), COALESCE(exercise, ''), COUNT(*),
+                         {", ".join(f"MAX({m}), COALESCE(SUM({m}), 0)" for m in SUMMARY_METRICS)}
+                  FROM workouts {{where}}
+                  GROUP BY COALESCE(entry_date, ''), COALESCE(exercise, '')"""
+    on_delete = f"""CREATE TRIGGER IF NOT EXISTS workouts_summary_delete AFTER DELETE ON workouts BEGIN
+                        DELETE FROM daily_summary
+                        WHERE entry_date = COALESCE(OLD.entry_date, '') AND exercise = COALESCE(OLD.exercise, '');
+                        {regroup.format(where="WHERE entry_date IS OLD.entry_date AND exercise IS OLD.exercise")};
+                    END"""
+    return table, on_insert, on_delete, regroup.format(where="")
+
+
+SUMMARY_TABLE, SUMMARY_INSERT_TRIGGER, SUMMARY_DELETE_TRIGGER, SUMMARY_REBUILD = _summary_sql()
+
+
+class WorkoutStore:
+    def __init__(self, db_path=DB_PATH, busy_timeout_ms=5000):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=busy_timeout_ms / 1000)
+        self._conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+        for name, value in PRAGMAS.items():
+            self._conn.execute(f"PRAGMA {name} = {value}")
+        self._create_schema()
+        self._writes = 0
+        self._frame = None
+        self._frame_version = None
+        self._last_id = 0
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS workouts (
+                                      id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                      entry_date TEXT,
+                                      workout_type TEXT,
+                                      exercise TEXT,
+                                      sets INTEGER,
+                                      reps INTEGER,
+                                      assistance_level TEXT,
+                                      dead_hang_seconds REAL,
+                                      negative_seconds REAL,
+                                      notes TEXT,
+                                      row_hash TEXT
+                                  )""")
+            if "row_hash" not in {info[1] for info in self._conn.execute("PRAGMA table_info(workouts)")}:
+                self._conn.execute("ALTER TABLE workouts ADD COLUMN row_hash TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_workouts_row_hash ON workouts (row_hash)")
+            # Rows written before row_hash existed, or by another tool
+            unhashed = self._conn.execute(
+                f"SELECT id, {', '.join(COLUMNS)} FROM workouts WHERE row_hash IS NULL").fetchall()
+            self._conn.executemany("UPDATE workouts SET row_hash = ? WHERE id = ?",
+                                   [(row_hash(row[1:]), row[0]) for row in unhashed])
+            # (entry_date, exercise) serves date ordering and the delete trigger's per-day lookup
+            self._conn.execute("DROP INDEX IF EXISTS idx_workouts_entry_date")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_workouts_day_exercise ON workouts (entry_date, exercise)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_workouts_exercise ON workouts (exercise)")
+            for statement in (SUMMARY_TABLE, SUMMARY_INSERT_TRIGGER, SUMMARY_DELETE_TRIGGER):
+                self._conn.execute(statement)
+            # Databases from before the summary table (or edited without the triggers) get it rebuilt
+            logged, summarized = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM workouts), (SELECT COALESCE(SUM(entries), 0) FROM daily_summary)"
+            ).fetchone()
+            if logged != summarized:
+                self._conn.execute("DELETE FROM daily_summary")
+                self._conn.execute(SUMMARY_REBUILD)
+
+    def insert(self, row):
+        self.insert_many([row])
+
+    def insert_many(self, rows):
+        """Insert row dicts (keys as in COLUMNS) in one transaction; returns the number inserted."""
+        values = [tuple(row[c] for c in COLUMNS) for row in rows]
+        with self._lock, self._conn:
+            self._insert_values(values)
+            self._writes += 1
+        return len(values)
+
+    def _insert_values(self, values, hashes=None):
+        hashes = hashes or [row_hash(v) for v in values]
+        self._conn.executemany(
+            f"INSERT INTO workouts ({', '.join(COLUMNS)}, row_hash) VALUES ({', '.join('?' * (len(COLUMNS) + 1))})",
+            [v + (h,) for v, h in zip(values, hashes)])
+
+    def _logged_counts(self, hashes):
+        counts = {}
+        hashes = list(hashes)
+        for i in range(0, len(hashes), 500):
+            part = hashes[i:i + 500]
+            counts.update(self._conn.execute(
+                f"SELECT row_hash, COUNT(*) FROM workouts WHERE row_hash IN ({', '.join('?' * len(part))}) "
+                "GROUP BY row_hash", part).fetchall())
+        return counts
+
+    def import_csv(self, source, column_map=None, chunksize=IMPORT_CHUNK_ROWS):
+        """Append the rows of a CSV file in one transaction, skipping rows that are already logged.
+
+        `source` is a path or file object in the tracker's own export format;
+        `column_map` maps COLUMNS to the file's header names for other layouts
+        (unmapped columns get defaults, extra file columns are ignored). The
+        file is parsed `chunksize` rows at a time. Returns counts of rows
+        read, inserted, duplicate and rejected, and the first few rejections.
+        """
+        column_map = {c: c for c in COLUMNS} if column_map is None else dict(column_map)
+        if not column_map.get("entry_date"):
+            raise ValueError("The import needs a column for entry_date")
+        header = {source_column: column for column, source_column in column_map.items() if source_column}
+        reader = pd.read_csv(source, usecols=lambda name: name in header, dtype=str,
+                             keep_default_na=False, na_values=[""], chunksize=chunksize)
+        result = {"read": 0, "inserted": 0, "duplicates": 0, "rejected": 0, "problems": []}
+        seen, logged = Counter(), {}
+        with self._lock, self._conn:
+            for chunk in reader:
+                chunk = chunk.rename(columns=header)
+                if "entry_date" not in chunk.columns:
+                    raise ValueError(f"Column {column_map['entry_date']!r} not found in the CSV")
+                rows, rejected = clean_chunk(chunk)
+                result["read"] += len(chunk)
+                result["rejected"] += len(rejected)
+                result["problems"].extend(rejected[:20 - len(result["problems"])])
+
+                hashes = [row_hash(row) for row in rows]
+                logged.update(self._logged_counts({h for h in hashes if h not in seen}))
+                fresh, fresh_hashes = [], []
+                for row, h in zip(rows, hashes):
+                    if seen[h] >= logged.get(h, 0):
+                        fresh.append(row)
+                        fresh_hashes.append(h)
+                    seen[h] += 1
+                self._insert_values(fresh, fresh_hashes)
+                result["inserted"] += len(fresh)
+                result["duplicates"] += len(rows) - len(fresh)
+            self._writes += 1
+        return result
+
+    def version(self):
+        """Changes whenever the table may have changed, from this connection or any other."""
+        with self._lock:
+            # data_version only moves for commits made by other connections
+            return self._conn.execute("PRAGMA data_version").fetchone()[0], self._writes
+
+    def _query(self, where="", params=()):
+        return pd.read_sql_query(f"SELECT id, {', '.join(COLUMNS)} FROM workouts {where} ORDER BY entry_date, id", self._conn,
+                                 params=params, parse_dates=['entry_date'])
+
+    def read(self):
+        """All workouts ordered by entry_date, loading only rows added since the last call."""
+        with self._lock:
+            version = self.version()
+            if self._frame is not None and version == self._frame_version:
+                return self._frame.copy()
+            new_rows = self._query("WHERE id > ?", (self._last_id,)) if self._frame is not None else None
+            total = self._conn.execute("SELECT COUNT(*) FROM workouts").fetchone()[0]
+            if new_rows is None or len(self._frame) + len(new_rows) != total:
+                # First load, or rows were deleted: start over
+                frame = self._query()
+            elif new_rows.empty or self._frame.empty:
+                frame = new_rows if self._frame.empty else self._frame
+            else:
+                frame = pd.concat([self._frame, new_rows], ignore_index=True)
+                if new_rows["entry_date"].min() < self._frame["entry_date"].max():
+                    # Back-dated entries: stable sort keeps id order within a day
+                    frame = frame.sort_values(["entry_date", "id"], kind="mergesort", ignore_index=True)
+            self._frame, self._frame_version = frame, version
+            self._last_id = int(frame["id"].max()) if not frame.empty else 0
+            return frame.copy()
+
+    def daily_progress(self, metric, exercise_like=()):
+        """Per-day max of `metric` from daily_summary, optionally only for exercises matching a LIKE pattern."""
+        if metric not in SUMMARY_METRICS:
+            raise ValueError(f"No summary kept for {metric!r}; expected one of {SUMMARY_METRICS}")
+        where = " OR ".join("exercise LIKE ?" for _ in exercise_like)
+        with self._lock:
+            return pd.read_sql_query(
+                f"SELECT entry_date, MAX(max_{metric}) AS {metric} FROM daily_summary "
+                f"{'WHERE ' + where if where else ''} GROUP BY entry_date ORDER BY entry_date",
+                self._conn, params=tuple(exercise_like), parse_dates=['entry_date'])
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM workouts")
+            self._writes += 1
+
+    def close(self):
+        with self._lock:
+            self._conn.close()